@@ -17,6 +17,12 @@ target_metadata = SQLModel.metadata
 
 config.set_main_option(name="sqlalchemy.url", value=settings.DATABASE_URL)
 
+def include_name(name: str | None, type_: str, parent_names: dict) -> bool:
+    # FTS5 虚拟表及其影子表由迁移手工维护, 不参与自动生成
+    if type_ == "table" and name and name.startswith("user_fts"):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     url: str | None = config.get_main_option("sqlalchemy.url")
     context.configure(
@@ -24,6 +30,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -34,7 +41,8 @@ def run_migrations_online() -> None:
     with engine.connect() as connection:
         context.configure(
             connection=connection, 
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
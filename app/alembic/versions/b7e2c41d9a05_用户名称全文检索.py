@@ -0,0 +1,60 @@
+"""用户名称全文检索
+
+Revision ID: b7e2c41d9a05
+Revises: 881e1d5ed06d
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41d9a05'
+down_revision: Union[str, None] = '881e1d5ed06d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 外部内容 FTS5 表, trigram 分词支持中文子串匹配
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS user_fts
+        USING fts5(name, content='user', content_rowid='id', tokenize='trigram')
+        """
+    )
+    # 触发器保持与 user 表同步
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON "user" BEGIN
+            INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF name ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+    # 为已有数据建立索引
+    op.execute("INSERT INTO user_fts(user_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS user_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS user_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS user_fts_ai")
+    op.execute("DROP TABLE IF EXISTS user_fts")
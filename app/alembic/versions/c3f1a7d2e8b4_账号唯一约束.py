@@ -0,0 +1,57 @@
+"""账号唯一约束
+
+Revision ID: c3f1a7d2e8b4
+Revises: b7e2c41d9a05
+Create Date: 2026-10-18 14:05:12.318804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a7d2e8b4'
+down_revision: Union[str, None] = 'b7e2c41d9a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_fts_triggers() -> None:
+    # SQLite 批量模式会重建 user 表, 表上的全文检索触发器需要重新创建
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON "user" BEGIN
+            INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF name ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+
+
+def upgrade() -> None:
+    # 模型中 username 声明了 unique, 但初始迁移未创建该约束
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.create_unique_constraint('uq_user_username', ['username'])
+    _create_fts_triggers()
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_constraint('uq_user_username', type_='unique')
+    _create_fts_triggers()
@@ -0,0 +1,65 @@
+"""口令哈希
+
+Revision ID: d8a4b6c2f1e9
+Revises: c3f1a7d2e8b4
+Create Date: 2026-10-18 16:21:47.902113
+
+"""
+import base64
+import hashlib
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4b6c2f1e9'
+down_revision: Union[str, None] = 'c3f1a7d2e8b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 迁移编写时的哈希格式与成本参数(冻结副本, 不引用应用代码与配置, 之后的修改不影响本迁移);
+# 应用按哈希中保存的参数校验, 成本参数调整后在登录时重新哈希
+PREFIX = "$scrypt$"
+SCRYPT_N = 16384
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def hash_password(password: str) -> str:
+    """$scrypt$n=<N>,r=<R>,p=<P>$<盐>$<哈希>"""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(
+        password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+        maxmem=256 * SCRYPT_R * (SCRYPT_N + SCRYPT_P), dklen=32,
+    )
+    return f"{PREFIX}n={SCRYPT_N},r={SCRYPT_R},p={SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def upgrade() -> None:
+    # 将已有的明文口令哈希, 已是哈希格式的跳过
+    conn = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('password', sa.String))
+    rows = conn.execute(sa.select(user.c.id, user.c.password).where(user.c.password.not_like(f"{PREFIX}%"))).all()
+    if rows:
+        conn.execute(
+            user.update().where(user.c.id == sa.bindparam('user_id')).values(password=sa.bindparam('hashed')),
+            [
+                {
+                    'user_id': id,
+                    'hashed': hash_password(password),
+                }
+                for id, password in rows
+            ],
+        )
+
+
+def downgrade() -> None:
+    # 哈希不可逆, 降级不恢复明文口令
+    pass
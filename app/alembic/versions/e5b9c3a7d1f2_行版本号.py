@@ -0,0 +1,57 @@
+"""行版本号
+
+Revision ID: e5b9c3a7d1f2
+Revises: d8a4b6c2f1e9
+Create Date: 2026-10-18 18:42:09.513620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c3a7d1f2'
+down_revision: Union[str, None] = 'd8a4b6c2f1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_table(
+        'table_version',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.execute("INSERT INTO table_version(name, version) VALUES ('user', 0)")
+
+    # 未显式修改 version 的更新自动递增行版本号(默认未开启 recursive_triggers, 不会递归触发)
+    op.execute(
+        """
+        CREATE TRIGGER user_version_au AFTER UPDATE ON "user" WHEN new.version = old.version BEGIN
+            UPDATE "user" SET version = old.version + 1 WHERE id = new.id;
+        END
+        """
+    )
+    # 任意增删改递增表版本号
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        op.execute(
+            f"""
+            CREATE TRIGGER table_version_user_{event.lower()} AFTER {event} ON "user" BEGIN
+                UPDATE table_version SET version = version + 1 WHERE name = 'user';
+            END
+            """
+        )
+
+
+def downgrade() -> None:
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER IF EXISTS table_version_user_{event}")
+    op.execute("DROP TRIGGER IF EXISTS user_version_au")
+    op.drop_table('table_version')
+    # SQLite 3.35+ 支持直接删除列, 无需重建表(重建会丢失全文检索触发器)
+    op.execute('ALTER TABLE "user" DROP COLUMN version')
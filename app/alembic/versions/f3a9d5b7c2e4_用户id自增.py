@@ -0,0 +1,54 @@
+"""用户ID自增
+
+Revision ID: f3a9d5b7c2e4
+Revises: e5b9c3a7d1f2
+Create Date: 2026-10-18 20:16:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9d5b7c2e4'
+down_revision: Union[str, None] = 'e5b9c3a7d1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _user_triggers() -> list[str]:
+    # 批量模式重建 user 表会丢失表上的触发器(全文检索、行版本号、表版本号), 重建前保存, 重建后原样创建
+    rows = op.get_bind().exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'user'"
+    )
+    return [row[0] for row in rows]
+
+
+def upgrade() -> None:
+    # 未声明 AUTOINCREMENT 时 SQLite 会复用已删除的最大 ID, 新用户的行版本号同样从 1 开始,
+    # 客户端缓存的已删除用户的 ETag 会与新用户匹配
+    triggers = _user_triggers()
+    with op.batch_alter_table('user', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    for sql in triggers:
+        op.execute(sql)
+    # 已删除的 ID 无从得知, 每次新增都会递增表版本号, 以其作为已分配 ID 的上界
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'user'")
+    op.execute(
+        """
+        INSERT INTO sqlite_sequence(name, seq) VALUES ('user', max(
+            (SELECT coalesce(max(id), 0) FROM "user"),
+            (SELECT version FROM table_version WHERE name = 'user')
+        ))
+        """
+    )
+
+
+def downgrade() -> None:
+    triggers = _user_triggers()
+    with op.batch_alter_table('user', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+        pass
+    for sql in triggers:
+        op.execute(sql)
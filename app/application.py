@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+应用工厂: uvicorn 以 app.application:create_app 加载, 只导入提供服务所需的模块,
+不经过命令行入口 main.py(typer、alembic)。各阶段的导入与初始化耗时记录在 startup_timer 中。
+"""
+
+from app.core.startup import startup_timer
+
+with startup_timer.phase("导入 FastAPI"):
+    from collections.abc import AsyncGenerator
+    from fastapi import FastAPI
+    from fastapi.concurrency import asynccontextmanager, run_in_threadpool
+
+with startup_timer.phase("导入配置与日志"):
+    from app.core.config import settings
+    from app.core.log import logger, log_handler
+
+with startup_timer.phase("导入数据库与模型"):
+    from app.core.database import create_db_and_tables, get_read_db, warm_up_pools
+    from app.model.user import User  # noqa: F401
+
+with startup_timer.phase("导入中间件、模板与静态资源"):
+    from app.core import assets
+    from app.core.admission import admission
+    from app.core.cache import identity_cache, user_list_cache
+    from app.core.exceptions import register_exception_handler
+    from app.core.metrics import mark_process_dead
+    from app.core.middlewares import register_middleware_handler
+    from app.core.profiler import continuous_profiler
+    from app.core.security import password_hasher
+    from app.core.templates import is_production, templates
+
+with startup_timer.phase("导入路由"):
+    from app.view.user import query_user_page, router as user_router
+
+
+async def warm_up() -> None:
+    """预热: 建立连接池中的连接、编译模板并执行一次列表查询, 避免第一个真实请求走冷路径"""
+    with startup_timer.phase("预热: 建立数据库连接"):
+        await warm_up_pools(settings.STARTUP_WARMUP_CONNECTIONS)
+    with startup_timer.phase("预热: 编译模板"):
+        templates.precompile()
+    with startup_timer.phase("预热: 首次查询"):
+        async for db in get_read_db():
+            await query_user_page(db, offset=0, limit=10, order_by=None, name=None, cursor=None, count=None)
+    with startup_timer.phase("预热: 口令哈希执行池"):
+        # 同时生成账号不存在时使用的占位哈希
+        await password_hasher.verify("", None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    自定义生命周期
+    """
+    logger.info(f"服务启动...{app.title}")
+    if settings.RUN_STARTUP_TASKS:
+        with startup_timer.phase("启动任务"):
+            await create_db_and_tables()
+    if settings.STARTUP_WARMUP:
+        await warm_up()
+        logger.info("预热完成")
+    elif is_production():
+        names = templates.precompile()
+        logger.info(f"模板预编译完成: {', '.join(names)}")
+    if settings.STARTUP_REPORT:
+        logger.info(startup_timer.report())
+    if settings.PROFILING_CONTINUOUS:
+        continuous_profiler.start()
+    yield
+    logger.info(f"服务关闭...{app.title}")
+    # 写出最后一个时间窗口的采样结果
+    continuous_profiler.stop()
+    templates.log_stats()
+    user_list_cache.log_stats()
+    identity_cache.log_stats()
+    admission.log_stats()
+    password_hasher.shutdown()
+    mark_process_dead()
+    # 等待队列中的日志写出
+    await run_in_threadpool(log_handler.flush)
+
+
+def create_app() -> FastAPI:
+
+    with startup_timer.phase("创建应用"):
+        # 创建FastAPI应用
+        app: FastAPI = FastAPI(lifespan=lifespan, debug=settings.DEBUG)
+
+        # 挂载静态文件
+        app.mount(path="/static", app=assets.create_static_app(is_production()), name="static")
+
+        # # 注册中间件
+        register_middleware_handler(app)
+
+        # # 注册异常
+        register_exception_handler(app)
+
+        # 注册路由
+        app.include_router(router=user_router, tags=["用户模块"])
+
+        if settings.METRICS_ENABLED:
+            from app.view.metrics import router as metrics_router
+
+            app.include_router(router=metrics_router, tags=["监控"])
+
+    return app
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+命令行: 只在顶层导入 typer, 各命令在执行时才导入所需的模块(alembic、uvicorn、应用代码),
+执行 upgrade 等命令时不会加载整个应用。由 main.py 作为脚本执行时导入。
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from app.core.startup import startup_timer
+
+with startup_timer.phase("导入 typer"):
+    import typer
+    from typer.main import Typer
+
+app: Typer = typer.Typer()
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    startup_report: bool = typer.Option(False, "--startup-report", help="输出各阶段的导入与初始化耗时"),
+) -> None:
+    """
+    应用管理命令。
+    """
+    if not startup_report:
+        return
+    # 工作进程读取该环境变量, 在预热完成后输出各自的报告
+    os.environ["STARTUP_REPORT"] = "True"
+    ctx.call_on_close(lambda: typer.echo(message=startup_timer.report()))
+
+
+def alembic_config():
+    """
+    Alembic 配置
+    """
+    with startup_timer.phase("导入 alembic"):
+        from alembic.config import Config
+
+    return Config(file_="alembic.ini")
+
+
+@app.command()
+def revision(message: str = "生成新的 Alembic 迁移脚本") -> None:
+    """
+    生成新的 Alembic 迁移脚本。
+    """
+    from alembic import command
+
+    command.revision(config=alembic_config(), message=message, autogenerate=True)
+    typer.echo(message=f"迁移脚本已生成: {message}")
+
+
+@app.command()
+def upgrade() -> None:
+    """
+    应用最新的 Alembic 迁移。
+    """
+    from alembic import command
+
+    command.upgrade(config=alembic_config(), revision="head")
+    typer.echo(message="所有迁移已应用。")
+
+
+@app.command()
+def compile_templates() -> None:
+    """
+    预编译模板并写入字节码缓存(部署构建阶段执行)。
+    """
+    with startup_timer.phase("导入模板"):
+        from app.core.templates import TimedJinja2Templates, create_environment
+
+    names = TimedJinja2Templates(env=create_environment(production=True)).precompile()
+    typer.echo(message=f"模板预编译完成: {', '.join(names)}")
+
+
+@app.command()
+def vendor_static(force: bool = typer.Option(False, help="覆盖已下载的文件")) -> None:
+    """
+    下载第三方前端资源到 static/vendor(需要网络, 下载后随代码提交)。
+    """
+    from app.core import assets
+
+    paths = assets.vendor_static(force=force)
+    typer.echo(message=f"已下载: {', '.join(paths)}" if paths else "第三方资源均已存在。")
+
+
+@app.command()
+def build_static() -> None:
+    """
+    构建静态资源: 指纹化文件名并预压缩, 写入构建目录(部署构建阶段执行)。
+    """
+    from app.core import assets
+    from app.core.config import settings
+
+    manifest = assets.build_static()
+    typer.echo(message=f"静态资源构建完成: {len(manifest)} 个文件 -> {settings.STATIC_BUILD_DIR}")
+
+
+@app.command(context_settings={"allow_extra_args": True, "ignore_unknown_options": True, "help_option_names": []})
+def bench(ctx: typer.Context) -> None:
+    """
+    整体压测: 登录、列表、详情、增删改的吞吐与延迟(参数见 python main.py bench --help)。
+    """
+    import subprocess
+
+    # 配置在导入时读取, 压测需要指向临时数据库, 因此在子进程中运行
+    cwd = Path(__file__).resolve().parent.parent
+    raise typer.Exit(code=subprocess.call([sys.executable, "-m", "benchmarks.suite", *ctx.args], cwd=cwd))
+
+
+@app.command()
+def run() -> None:
+    """
+    启动应用。
+    """
+    with startup_timer.phase("导入 uvicorn"):
+        import uvicorn
+        from app.core.log import uvicorn_logger
+
+    uvicorn.run(
+        app="app.application:create_app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        factory=True,
+        log_config=uvicorn_logger(),
+    )
+
+
+@app.command()
+def serve(
+    host: str = typer.Option(None, help="监听地址, 默认 SERVER_HOST"),
+    port: int = typer.Option(None, help="监听端口, 默认 SERVER_PORT"),
+    workers: int = typer.Option(None, help="工作进程数, 默认 SERVER_WORKERS"),
+) -> None:
+    """
+    以生产模式启动应用(多进程, 关闭热重载和调试)。
+    """
+    import asyncio
+    import shutil
+
+    with startup_timer.phase("导入 uvicorn"):
+        import uvicorn
+        from app.core.config import settings
+        from app.core.log import uvicorn_logger
+
+    host = settings.SERVER_HOST if host is None else host
+    port = settings.SERVER_PORT if port is None else port
+    workers = settings.SERVER_WORKERS if workers is None else workers
+
+    # 启动任务只在主进程执行一次, 关闭调试, 连接池按实际进程数划分。工作进程通过环境变量继承配置;
+    # 单进程时 uvicorn 在当前进程内运行应用, 已加载的配置同样需要覆盖, 且须在创建数据库引擎之前
+    overrides = {"RUN_STARTUP_TASKS": False, "DEBUG": False, "SERVER_WORKERS": workers}
+    for name, value in overrides.items():
+        os.environ[name] = str(value)
+        setattr(settings, name, value)
+
+    with startup_timer.phase("启动任务"):
+        from app.core.database import async_engine, create_db_and_tables
+
+        async def startup() -> None:
+            await create_db_and_tables()
+            await async_engine.dispose()
+
+        asyncio.run(startup())
+    if workers > 1:
+        # 工作进程是新启动的解释器, 导入 prometheus_client 前即可读到该变量, 指标写入共享文件后合并采集
+        metrics_dir = settings.BASE_DIR.joinpath(settings.METRICS_MULTIPROC_DIR)
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        metrics_dir.mkdir(parents=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(metrics_dir)
+        # 缓存失效记录只对本次启动的工作进程有意义
+        shutil.rmtree(settings.BASE_DIR.joinpath(settings.CACHE_INVALIDATION_DIR), ignore_errors=True)
+
+    uvicorn.run(
+        app="app.application:create_app",
+        host=host,
+        port=port,
+        workers=workers,
+        reload=False,
+        factory=True,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_TIMEOUT_KEEP_ALIVE,
+        timeout_graceful_shutdown=settings.SERVER_TIMEOUT_GRACEFUL_SHUTDOWN,
+        log_config=uvicorn_logger(),
+    )
+
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import itertools
+import time
+
+from app.core.config import settings
+from app.core.log import logger
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED
+
+
+class AdmissionController:
+    """
+    准入控制: 每个工作进程同时处理的请求数不超过 max_in_flight, 超出的请求按优先级排队,
+    队列长度与等待时间都有上限, 超出时立即拒绝, 避免请求无限堆积拖慢所有接口。
+
+    队列已满时, 优先级更高的请求会挤掉队列中优先级最低、最晚到达的请求。
+    优先级数值越小越优先, 同一优先级先到先得。
+    """
+
+    def __init__(self, max_in_flight: int, queue_size: int, timeout: float) -> None:
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        # (优先级, 到达序号, 等待结果), 队列长度有上限, 直接线性查找
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+        self.max_queue_depth = 0
+        self.shed: dict[str, int] = {"queue_full": 0, "timeout": 0, "evicted": 0}
+        self._shed_since_log = 0
+        self._last_log_time = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.waiters)
+
+    async def acquire(self, priority: int) -> bool:
+        """获取处理名额, 返回 False 表示请求被拒绝"""
+        if self.in_flight < self.max_in_flight and not self.waiters:
+            self._admit()
+            return True
+
+        if len(self.waiters) >= self.queue_size:
+            victim = max(self.waiters, default=None)
+            if victim is None or victim[0] <= priority:
+                self._reject("queue_full", priority)
+                return False
+            self.waiters.remove(victim)
+            victim[2].set_result(False)
+            self._reject("evicted", victim[0])
+
+        entry = (priority, next(self.sequence), asyncio.get_running_loop().create_future())
+        self.waiters.append(entry)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self.waiters))
+        ADMISSION_QUEUE_DEPTH.inc()
+        try:
+            return await asyncio.wait_for(entry[2], self.timeout)
+        except asyncio.TimeoutError:
+            # 超时与名额转交同时发生时 future 已有结果, 名额已计入 in_flight, 按放行处理
+            if entry[2].done() and not entry[2].cancelled() and entry[2].result():
+                return True
+            self._reject("timeout", priority)
+            return False
+        except asyncio.CancelledError:
+            # 客户端断开时已经分配的名额需要归还
+            if entry[2].done() and not entry[2].cancelled() and entry[2].result():
+                self.release()
+            raise
+        finally:
+            if entry in self.waiters:
+                self.waiters.remove(entry)
+            ADMISSION_QUEUE_DEPTH.dec()
+
+    def release(self) -> None:
+        """归还名额, 直接转交给队列中优先级最高的请求"""
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec()
+        while self.waiters:
+            entry = min(self.waiters)
+            self.waiters.remove(entry)
+            if not entry[2].done():
+                self._admit()
+                entry[2].set_result(True)
+                return
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.inc()
+
+    def _reject(self, reason: str, priority: int) -> None:
+        self.shed[reason] += 1
+        self._shed_since_log += 1
+        ADMISSION_SHED.labels(reason, str(priority)).inc()
+        # 过载时每秒最多输出一条日志, 避免日志本身加重负载
+        now = time.monotonic()
+        if now - self._last_log_time >= 1:
+            logger.warning(
+                f"准入控制拒绝请求: 近期 {self._shed_since_log} 个, 处理中 {self.in_flight}, 排队 {len(self.waiters)}, 原因: {reason}"
+            )
+            self._shed_since_log = 0
+            self._last_log_time = now
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            **{f"shed_{reason}": count for reason, count in self.shed.items()},
+        }
+
+    def log_stats(self) -> None:
+        if self.enabled:
+            logger.info(f"准入控制统计: {self.stats()}")
+
+
+# 路径前缀按长度降序, 最长匹配优先
+PRIORITY_PREFIXES = sorted(settings.ADMISSION_PRIORITIES.items(), key=lambda item: -len(item[0]))
+
+
+def request_priority(path: str) -> int:
+    """按最长匹配的路径前缀确定优先级, 未配置的路径为 1"""
+    for prefix, priority in PRIORITY_PREFIXES:
+        if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+            return priority
+    return 1
+
+
+# 全局准入控制实例(每个工作进程一个)
+admission = AdmissionController(
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import stat
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import anyio
+from jinja2 import pass_context
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+try:
+    # 可选依赖, 安装后额外生成 .br 预压缩文件
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# 第三方前端资源: 本地路径(相对 static 目录) -> 下载地址, 未执行 vendor-static 时模板回退到该地址
+VENDOR_ASSETS: dict[str, str] = {
+    "vendor/bootstrap/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "vendor/bootstrap/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
+    "vendor/bootstrap-icons/bootstrap-icons.min.css": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css",
+    "vendor/bootstrap-icons/fonts/bootstrap-icons.woff2": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff2",
+    "vendor/bootstrap-icons/fonts/bootstrap-icons.woff": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff",
+}
+
+# 预压缩的文件类型(图片、woff2 等本身已压缩, 不再处理)
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".map", ".txt", ".html", ".xml", ".ttf", ".eot"}
+MANIFEST_NAME = "manifest.json"
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def source_dir() -> Path:
+    return settings.BASE_DIR.joinpath("static")
+
+
+def build_dir() -> Path:
+    return settings.BASE_DIR.joinpath(settings.STATIC_BUILD_DIR)
+
+
+def vendor_static(force: bool = False) -> list[str]:
+    """下载第三方前端资源到 static/vendor, 下载后随代码提交"""
+    downloaded = []
+    for path, url in VENDOR_ASSETS.items():
+        target = source_dir().joinpath(path)
+        if target.exists() and not force:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            target.write_bytes(response.read())
+        downloaded.append(path)
+    return downloaded
+
+
+def _fingerprint(path: str, content: bytes) -> str:
+    stem, suffix = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{suffix}"
+
+
+def _rewrite_css(path: str, content: bytes, manifest: dict[str, str]) -> bytes:
+    """将 CSS 中引用的本地文件替换为指纹化后的文件名"""
+    base = posixpath.dirname(path)
+
+    def replace(match: re.Match) -> str:
+        quote, url = match.groups()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        target, _, fragment = url.partition("#")
+        hashed = manifest.get(posixpath.normpath(posixpath.join(base, target.partition("?")[0])))
+        if hashed is None:
+            return match.group(0)
+        # 查询参数只用于破坏缓存, 指纹化后不再需要; 保留片段标识(如字体的 #iefix)
+        fragment = f"#{fragment}" if fragment else ""
+        return f"url({quote}{posixpath.relpath(hashed, base)}{fragment}{quote})"
+
+    return CSS_URL.sub(replace, content.decode()).encode()
+
+
+def _precompress(file: Path, content: bytes) -> None:
+    """写入 .gz(及 .br) 预压缩文件, 压缩收益不足时跳过"""
+    if file.suffix not in COMPRESSIBLE_SUFFIXES or len(content) < 256:
+        return
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content, quality=11)))
+    for suffix, data in variants:
+        if len(data) < len(content) * 0.9:
+            file.with_name(file.name + suffix).write_bytes(data)
+
+
+def build_static() -> dict[str, str]:
+    """
+    构建静态资源: 文件名加入内容哈希、改写 CSS 中的引用并预压缩, 写入 manifest.json
+
+    构建目录同时保留原文件名, 未经模板引用的地址仍可访问(不做长期缓存)。
+    """
+    source, target = source_dir(), build_dir()
+    if target.exists():
+        shutil.rmtree(target)
+    target.mkdir(parents=True)
+
+    files = sorted(file.relative_to(source).as_posix() for file in source.rglob("*") if file.is_file())
+    # CSS 最后处理, 此时其引用的字体、图片已有指纹化文件名
+    files.sort(key=lambda path: path.endswith(".css"))
+    manifest: dict[str, str] = {}
+    for path in files:
+        content = source.joinpath(path).read_bytes()
+        if path.endswith(".css"):
+            content = _rewrite_css(path, content, manifest)
+        manifest[path] = _fingerprint(path, content)
+        for name in (path, manifest[path]):
+            file = target.joinpath(name)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_bytes(content)
+            _precompress(file, content)
+
+    target.joinpath(MANIFEST_NAME).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+@lru_cache
+def load_manifest() -> dict[str, str]:
+    """读取构建清单, 未构建时返回空字典"""
+    file = build_dir().joinpath(MANIFEST_NAME)
+    if not file.exists():
+        return {}
+    return json.loads(file.read_text(encoding="utf-8"))
+
+
+@lru_cache(maxsize=1024)
+def resolve_static(path: str, production: bool) -> str:
+    """
+    解析模板中引用的静态资源路径
+
+    Returns:
+        str: 生产模式下为指纹化后的路径; 第三方资源未下载到本地时为 CDN 地址; 否则原样返回
+    """
+    key = path.lstrip("/")
+    if production and key in load_manifest():
+        return "/" + load_manifest()[key]
+    if key in VENDOR_ASSETS and not source_dir().joinpath(key).exists():
+        return VENDOR_ASSETS[key]
+    return path
+
+
+def create_url_for(production: bool):
+    """模板中的 url_for, 静态资源经清单解析为指纹化地址"""
+
+    @pass_context
+    def url_for(context: dict[str, Any], name: str, /, **path_params: Any) -> Any:
+        if name == "static" and "path" in path_params:
+            path_params["path"] = resolve_static(path_params["path"], production)
+            if path_params["path"].startswith("https://"):
+                return path_params["path"]
+        return context["request"].url_for(name, **path_params)
+
+    return url_for
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    提供构建目录中的静态资源: 按 Accept-Encoding 优先返回 .br / .gz 预压缩文件,
+    指纹化文件名设置一年的 immutable 缓存, 其余文件每次协商缓存。
+    """
+
+    def __init__(self, *, directory: Path, manifest: dict[str, str]) -> None:
+        super().__init__(directory=directory)
+        self.fingerprinted = set(manifest.values())
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if path.replace(os.sep, "/") in self.fingerprinted:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        if scope["method"] not in ("GET", "HEAD"):
+            return None
+        request_headers = Headers(scope=scope)
+        accepted = {item.split(";")[0].strip() for item in request_headers.get("accept-encoding", "").split(",")}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                    headers={"Content-Encoding": encoding},
+                )
+                if self.is_not_modified(response.headers, request_headers):
+                    return NotModifiedResponse(response.headers)
+                return response
+        return None
+
+
+def create_static_app(production: bool) -> StaticFiles:
+    """生产模式且已构建时提供构建目录, 否则直接提供 static 目录"""
+    manifest = load_manifest()
+    if production and manifest:
+        return PrecompressedStaticFiles(directory=build_dir(), manifest=manifest)
+    return StaticFiles(directory=source_dir())
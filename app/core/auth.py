@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import hmac
+import time
+
+from fastapi import HTTPException, Request, status
+
+from app.core.cache import identity_cache
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.core.templates import is_partial
+from app.model.user import Identity, User
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def create_session_token(user_id: int, max_age: int | None = None) -> str:
+    """
+    生成会话令牌
+
+    Returns:
+        str: <用户ID>.<过期时间戳>.<HMAC-SHA256 签名>
+    """
+    payload = f"{user_id}.{int(time.time()) + (max_age or settings.SESSION_MAX_AGE)}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_session_token(token: str | None) -> int | None:
+    """校验签名与过期时间, 通过时返回用户ID, 不访问数据库"""
+    if not token:
+        return None
+    payload, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    user_id, _, expires = payload.partition(".")
+    try:
+        if int(expires) < time.time():
+            return None
+        return int(user_id)
+    except ValueError:
+        return None
+
+
+async def load_identity(user_id: int) -> Identity | None:
+    """从数据库加载身份信息"""
+    identity = None
+    async for db in get_read_db():
+        user = await db.get(User, user_id)
+        if user:
+            identity = Identity.model_validate(user)
+    return identity
+
+
+async def identify(request: Request) -> Identity | None:
+    """校验会话签名后从身份缓存中取身份信息, 未命中时才查询数据库, 未登录返回 None"""
+    user_id = read_session_token(request.cookies.get(settings.SESSION_COOKIE_NAME))
+    if user_id is None:
+        return None
+    # 签名有效但用户已被删除时同样缓存(时间较短), 携带该会话的请求不会每次都查询数据库
+    identity, _ = await identity_cache.get_or_set(
+        user_id, lambda: load_identity(user_id), negative_ttl=settings.IDENTITY_CACHE_NEGATIVE_TTL,
+    )
+    return identity
+
+
+async def get_current_user(request: Request) -> Identity:
+    """
+    登录校验依赖: 未登录时浏览器页面请求重定向到登录页, 接口及片段请求返回 401
+    """
+    identity = await identify(request)
+    if identity is None:
+        if request.method == "GET" and not is_partial(request) and "text/html" in request.headers.get("accept", ""):
+            raise HTTPException(status_code=status.HTTP_303_SEE_OTHER, detail="未登录", headers={"Location": "/"})
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="未登录或登录已过期")
+    request.state.user = identity
+    return identity
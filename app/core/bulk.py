@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+
+def detect_format(content_type: str | None, format: str | None) -> str:
+    """根据 format 参数或 Content-Type 判断数据格式, 默认 JSON Lines"""
+    if format:
+        return format.lower()
+    if content_type and "csv" in content_type.lower():
+        return "csv"
+    return "jsonl"
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_length: int, encoding: str = "utf-8") -> AsyncIterator[str | None]:
+    """
+    增量解码请求体并按行切分, 不在内存中保留完整请求体
+
+    每块只查找新到达部分中的换行, 未结束的行分段保存; 超过 max_length 的行丢弃已缓冲的内容,
+    读到行尾时产出 None, 由调用方作为该行的错误处理。
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending: list[str] = []
+    pending_length = 0
+    oversized = False
+    final = False
+    while not final:
+        try:
+            text = decoder.decode(await anext(stream))
+        except StopAsyncIteration:
+            text = decoder.decode(b"", final=True)
+            final = True
+        start = 0
+        while (end := text.find("\n", start)) != -1:
+            if oversized or pending_length + end - start > max_length:
+                yield None
+            else:
+                pending.append(text[start:end])
+                yield "".join(pending).rstrip("\r")
+            pending.clear()
+            pending_length = 0
+            oversized = False
+            start = end + 1
+        if oversized or start == len(text):
+            continue
+        pending_length += len(text) - start
+        if pending_length > max_length:
+            oversized = True
+            pending.clear()
+        else:
+            pending.append(text[start:])
+    if oversized:
+        yield None
+    elif pending:
+        yield "".join(pending).rstrip("\r")
+
+
+async def iter_records(
+    stream: AsyncIterator[bytes], format: str, max_line_length: int = 65536,
+) -> AsyncIterator[tuple[int, dict[str, Any] | str]]:
+    """
+    逐行解析 JSON Lines 或 CSV(首行为表头, 不支持字段内换行), 超过 max_line_length 个字符的行作为该行的错误
+
+    Yields:
+        tuple: (行号, 记录字典), 解析失败时第二项为错误信息
+    """
+    if format not in ("jsonl", "csv"):
+        raise ValueError(f"不支持的数据格式: {format}")
+
+    header: list[str] | None = None
+    line_no = 0
+    async for line in iter_lines(stream, max_line_length):
+        line_no += 1
+        if line is None:
+            yield line_no, f"行长度超过上限 {max_line_length} 个字符"
+            continue
+        if not line.strip():
+            continue
+        if format == "jsonl":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, f"JSON 格式错误: {e.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, "每行必须是 JSON 对象"
+                continue
+            yield line_no, record
+        else:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [value.strip().lstrip("﻿") for value in values]
+                continue
+            if len(values) != len(header):
+                yield line_no, f"列数与表头不一致: {len(values)} != {len(header)}"
+                continue
+            yield line_no, {key: value or None for key, value in zip(header, values)}
+
+
+async def batched(records: AsyncIterator[Any], size: int) -> AsyncIterator[list[Any]]:
+    """按固定大小分批"""
+    batch: list[Any] = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
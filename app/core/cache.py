@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable, Collection, Hashable
+from importlib import import_module
+from typing import Any
+
+from app.core.config import settings
+from app.core.log import logger
+from app.core.metrics import CACHE_HITS, CACHE_INVALIDATIONS, CACHE_MISSES
+
+
+# 缓存未命中的标记, 与缓存的 None 值区分
+MISSING = object()
+
+
+class InvalidationBackend(ABC):
+    """
+    缓存失效后端接口: 每个命名空间维护一个版本号, 写操作递增版本号并记录失效的键,
+    各进程的本地缓存在读取时比对版本号, 不一致时只移除期间失效的键, 无从得知时整体失效。
+    多进程部署时实现该接口接入共享存储(如 Redis 的 INCR/GET)即可共享失效通知。
+    """
+
+    @abstractmethod
+    async def get_version(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump(self, namespace: str, keys: Collection[Hashable] | None = None) -> int:
+        """递增版本号并记录失效的键(None 表示整体失效), 返回新版本号"""
+
+    async def changed_keys(self, namespace: str, since: int) -> set[Hashable] | None:
+        """版本号 since 之后失效的键; 期间有整体失效或后端不记录键时返回 None"""
+        return None
+
+
+class LocalInvalidationBackend(InvalidationBackend):
+    """进程内失效后端, 单进程部署及测试使用"""
+
+    def __init__(self, log_size: int = 1024) -> None:
+        self.versions: dict[str, int] = {}
+        # 每个命名空间最近的失效记录: (版本号, 失效的键)
+        self.logs: dict[str, deque[tuple[int, Collection[Hashable] | None]]] = {}
+        self.log_size = log_size
+
+    async def get_version(self, namespace: str) -> int:
+        return self.versions.get(namespace, 0)
+
+    async def bump(self, namespace: str, keys: Collection[Hashable] | None = None) -> int:
+        self.versions[namespace] = self.versions.get(namespace, 0) + 1
+        self.logs.setdefault(namespace, deque(maxlen=self.log_size)).append((self.versions[namespace], keys))
+        return self.versions[namespace]
+
+    async def changed_keys(self, namespace: str, since: int) -> set[Hashable] | None:
+        log = self.logs.get(namespace)
+        if not log or log[0][0] > since + 1:
+            # 记录已被淘汰
+            return None
+        changed: set[Hashable] = set()
+        for version, keys in log:
+            if version <= since:
+                continue
+            if keys is None:
+                return None
+            changed.update(keys)
+        return changed
+
+
+class FileInvalidationBackend(InvalidationBackend):
+    """
+    文件失效后端, 同一主机上的多个工作进程共享失效通知
+
+    每个命名空间一个只追加的记录文件, 每次失效用一次 os.write 追加一行(失效的键列表, 整体失效为 null),
+    文件大小即版本号: 读取缓存时只需一次 stat, 版本变化时读取新增部分即可得知失效的键。
+    键需要能以 JSON 表示(如用户ID)。文件随写操作增长, serve 启动时清空目录。
+    """
+
+    def __init__(self, directory: str | None = None) -> None:
+        self.directory = settings.BASE_DIR.joinpath(directory or settings.CACHE_INVALIDATION_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, namespace: str) -> str:
+        return str(self.directory.joinpath(f"{namespace}.log"))
+
+    async def get_version(self, namespace: str) -> int:
+        try:
+            return os.stat(self._path(namespace)).st_size
+        except FileNotFoundError:
+            return 0
+
+    async def bump(self, namespace: str, keys: Collection[Hashable] | None = None) -> int:
+        line = json.dumps(None if keys is None else list(keys), separators=(",", ":")) + "\n"
+        fd = os.open(self._path(namespace), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+    async def changed_keys(self, namespace: str, since: int) -> set[Hashable] | None:
+        try:
+            with open(self._path(namespace), "rb") as file:
+                if since > os.fstat(file.fileno()).st_size:
+                    # 文件已被清空重建
+                    return None
+                file.seek(since)
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        changed: set[Hashable] = set()
+        for line in data.splitlines():
+            keys = json.loads(line)
+            if keys is None:
+                return None
+            changed.update(keys)
+        return changed
+
+
+def load_backend(path: str) -> InvalidationBackend:
+    """按 模块路径.类名 加载失效后端"""
+    module_name, _, class_name = path.rpartition(".")
+    return getattr(import_module(module_name), class_name)()
+
+
+class ResponseCache:
+    """进程内 LRU + TTL 缓存, 通过失效后端的版本号实现跨进程失效"""
+
+    def __init__(self, namespace: str, backend: InvalidationBackend, maxsize: int = 256, ttl: float = 30) -> None:
+        self.namespace = namespace
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _sync_version(self) -> None:
+        version = await self.backend.get_version(self.namespace)
+        if version != self.version:
+            keys = await self.backend.changed_keys(self.namespace, self.version) if self.entries else None
+            if keys is None:
+                self.entries.clear()
+            else:
+                for key in keys:
+                    self.entries.pop(key, None)
+            self.version = version
+
+    async def _lookup(self, key: Hashable) -> Any:
+        """读取缓存, 未命中返回 MISSING(缓存的值可以是 None)"""
+        await self._sync_version()
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            CACHE_MISSES.labels(self.namespace).inc()
+            return MISSING
+        self.entries.move_to_end(key)
+        self.hits += 1
+        CACHE_HITS.labels(self.namespace).inc()
+        return entry[1]
+
+    async def get(self, key: Hashable) -> Any | None:
+        value = await self._lookup(key)
+        return None if value is MISSING else value
+
+    async def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def get_or_set(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]], negative_ttl: float | None = None,
+    ) -> tuple[Any, bool]:
+        """
+        读取缓存, 未命中时调用 factory 生成并写入; factory 返回 None 时只在指定 negative_ttl 时缓存该结果
+
+        Returns:
+            tuple: (缓存值, 是否命中)
+        """
+        value = await self._lookup(key)
+        if value is not MISSING:
+            return value, True
+        version = self.version
+        value = await factory()
+        # 生成期间发生过失效则不写入, 避免缓存写操作之前的旧数据
+        if version == self.version and (value is not None or negative_ttl):
+            await self.set(key, value, ttl=None if value is not None else negative_ttl)
+        return value, False
+
+    async def invalidate(self) -> None:
+        """整体失效"""
+        self.entries.clear()
+        self.version = await self.backend.bump(self.namespace)
+        self.invalidations += 1
+        CACHE_INVALIDATIONS.labels(self.namespace).inc()
+
+    async def delete(self, *keys: Hashable) -> None:
+        """只失效指定的键, 其余缓存保留"""
+        if not keys:
+            return
+        await self.backend.bump(self.namespace, keys)
+        # 同步版本号(同时移除这些键), 正在生成的旧值不会再写入
+        await self._sync_version()
+        for key in keys:
+            self.entries.pop(key, None)
+        self.invalidations += 1
+        CACHE_INVALIDATIONS.labels(self.namespace).inc()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self.entries),
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"缓存统计: {self.namespace}, {self.stats()}")
+
+
+# 失效后端、用户列表缓存与身份缓存; 未配置后端时, 多进程部署使用文件后端在工作进程间共享失效通知
+cache_backend: InvalidationBackend = load_backend(
+    settings.CACHE_BACKEND
+    or ("app.core.cache.FileInvalidationBackend" if settings.SERVER_WORKERS > 1 else "app.core.cache.LocalInvalidationBackend")
+)
+user_list_cache = ResponseCache(
+    namespace="user_list",
+    backend=cache_backend,
+    maxsize=settings.USER_LIST_CACHE_SIZE,
+    ttl=settings.USER_LIST_CACHE_TTL,
+)
+identity_cache = ResponseCache(
+    namespace="identity",
+    backend=cache_backend,
+    maxsize=settings.IDENTITY_CACHE_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL,
+)
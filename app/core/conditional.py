@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from fastapi import Request, status
+from starlette.responses import Response
+
+
+def make_etag(*parts: object) -> str:
+    """由版本号等组成部分生成弱 ETag"""
+    return 'W/"' + ".".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """按弱比较判断 If-None-Match / If-Match 请求头是否包含该 ETag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """If-None-Match 命中时返回 304 响应, 否则返回 None"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
@@ -2,9 +2,23 @@
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class RateLimitRule(BaseModel):
+    """
+    限流规则(令牌桶): 每 period 秒补充 limit 个令牌, 桶容量 burst(默认等于 limit)
+
+    key: ip 按客户端地址; username 按登录表单中的账号; user 按会话中的用户, 未登录时按客户端地址
+    """
+    limit: int
+    period: float
+    burst: int | None = None
+    key: Literal["ip", "username", "user"] = "ip"
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file='.env', 
@@ -15,13 +29,207 @@ class Settings(BaseSettings):
     # 项目根目录
     BASE_DIR: Path = Path(__file__).parent.parent.parent
 
+    # 调试模式, 生产模式(serve)下关闭
+    DEBUG: bool = True
+
+    # 是否在 lifespan 中执行启动任务(初始化管理员等), 多进程部署时由主进程执行一次后关闭
+    RUN_STARTUP_TASKS: bool = True
+    # 启动预热: 建立连接、编译模板并执行一次查询后才开始接收请求
+    STARTUP_WARMUP: bool = True
+    # 预热时每个连接池预先建立的连接数
+    STARTUP_WARMUP_CONNECTIONS: int = 4
+    # 预热完成后输出各阶段的导入与初始化耗时(命令行 --startup-report)
+    STARTUP_REPORT: bool = False
+
+    # 服务配置(python main.py serve)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    # 事件循环实现: auto 时已安装 uvloop 则使用 uvloop
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    # HTTP 协议实现: auto 时已安装 httptools 则使用 httptools
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    # 监听队列长度
+    SERVER_BACKLOG: int = 2048
+    # keep-alive 超时(秒)
+    SERVER_TIMEOUT_KEEP_ALIVE: int = 5
+    # 优雅关闭超时(秒)
+    SERVER_TIMEOUT_GRACEFUL_SHUTDOWN: int | None = 30
+
+    # 模板生产模式: 关闭自动重载, 启动时预编译并使用文件字节码缓存, 未设置时跟随 DEBUG
+    TEMPLATE_PRODUCTION: bool | None = None
+    # 模板字节码缓存目录(相对项目根目录), 多个工作进程共享
+    TEMPLATE_CACHE_DIR: str = ".cache/jinja2"
+    # 静态资源构建目录(相对项目根目录), 由 build-static 生成, 生产模式下存在时提供指纹化及预压缩文件
+    STATIC_BUILD_DIR: str = ".cache/static"
+
+    # 缓存失效后端(模块路径.类名); 未配置时单进程使用进程内后端, SERVER_WORKERS > 1 时使用文件后端在同一主机的工作进程间共享,
+    # 跨主机部署时替换为共享存储实现
+    CACHE_BACKEND: str | None = None
+    # 文件失效后端的记录目录(相对项目根目录), serve 启动时清空
+    CACHE_INVALIDATION_DIR: str = ".cache/invalidation"
+    # 用户列表缓存
+    USER_LIST_CACHE_ENABLED: bool = True
+    USER_LIST_CACHE_SIZE: int = 256
+    USER_LIST_CACHE_TTL: float = 30
+
     # sqlite 数据库名称
     SQLITE_DB_NAME: str = "app.db"
 
+    # 是否启用异步数据库会话(False 时回退到同步 Session, 便于对比压测)
+    DATABASE_ASYNC: bool = True
+
+    # 用户名称搜索是否使用 FTS5 全文检索(需执行迁移创建 user_fts 表)
+    USER_SEARCH_FTS: bool = True
+
+    # 批量导入/更新/删除每批行数, 每批一次 executemany 并提交一次事务
+    BULK_BATCH_SIZE: int = 1000
+    # 批量操作报告中错误明细的最大条数
+    BULK_MAX_ERRORS: int = 1000
+    # 批量操作单行的最大字符数, 超出的行记为错误, 避免无换行的请求体整体缓存在内存中
+    BULK_MAX_LINE_LENGTH: int = 65536
+    # 导出时服务端游标每批读取的行数
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # 口令哈希(scrypt)成本参数, 调整后用户下次登录时按新参数重新哈希
+    PASSWORD_SCRYPT_N: int = 16384
+    PASSWORD_SCRYPT_R: int = 8
+    PASSWORD_SCRYPT_P: int = 1
+    # 口令哈希执行池: thread 线程池(scrypt 计算期间释放 GIL) 或 process 进程池
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    # 执行池大小, 同时也是单进程内并发计算哈希的上限
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # 会话签名密钥, 生产环境必须通过环境变量或 .env 覆盖
+    SECRET_KEY: str = "fastapi-jinja2-dev-secret-key"
+    # 会话 Cookie
+    SESSION_COOKIE_NAME: str = "session"
+    SESSION_MAX_AGE: int = 86400
+    SESSION_COOKIE_SECURE: bool = False
+    # 身份缓存: 会话校验通过后按用户ID缓存身份信息, 修改或删除用户时只移除该用户
+    IDENTITY_CACHE_SIZE: int = 10000
+    # 失效通知只在共享同一失效后端的进程间传递: 自行配置了不跨进程的 CACHE_BACKEND 时, 其他工作进程中被删除或降权的用户
+    # 最多在该时长内仍以缓存的身份通过校验
+    IDENTITY_CACHE_TTL: float = 60
+    # 会话对应的用户不存在(已删除)时, 该结果的缓存时长
+    IDENTITY_CACHE_NEGATIVE_TTL: float = 10
+
+    # 成功请求的访问日志采样率(0~1), 失败请求始终记录
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+
+    # 响应压缩: 小于该字节数的完整响应不压缩
+    COMPRESSION_MINIMUM_SIZE: int = 500
+    # gzip 压缩级别(1~9), brotli / zstd 使用各自适合在线压缩的级别
+    COMPRESSION_GZIP_LEVEL: int = 6
+
+    # 准入控制: 每个工作进程同时处理的请求数上限, 0 表示不限制
+    ADMISSION_MAX_IN_FLIGHT: int = 64
+    # 超过上限后排队的请求数上限, 队列已满时立即返回 503
+    ADMISSION_QUEUE_SIZE: int = 128
+    # 排队最长等待时间(秒), 超时返回 503
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    # 503 响应的 Retry-After(秒)
+    ADMISSION_RETRY_AFTER: int = 1
+    # 请求优先级: 路径前缀 -> 优先级(数值越小越优先), 未配置的路径为 1
+    ADMISSION_PRIORITIES: dict[str, int] = {"/login": 0, "/static": 0, "/metrics": 0, "/users": 2}
+
+    # 限流后端(模块路径.类名), 多进程部署时替换为共享实现
+    RATE_LIMIT_BACKEND: str = "app.core.ratelimit.LocalRateLimitBackend"
+    RATE_LIMIT_ENABLED: bool = True
+    # 进程内限流后端最多保留的令牌桶数, 闲置至回满的桶会提前清理
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    # 按路由配置限流: "方法 路由模板" -> 规则列表, 须全部通过
+    RATE_LIMITS: dict[str, list[RateLimitRule]] = {
+        "POST /login": [
+            RateLimitRule(limit=20, period=60, key="ip"),
+            RateLimitRule(limit=5, period=60, key="username"),
+        ],
+        "POST /user": [RateLimitRule(limit=60, period=60, key="user")],
+        "PUT /user/{id}": [RateLimitRule(limit=120, period=60, key="user")],
+        "DELETE /user/{id}": [RateLimitRule(limit=120, period=60, key="user")],
+        "POST /users/bulk": [RateLimitRule(limit=10, period=60, key="user")],
+        "PUT /users/bulk": [RateLimitRule(limit=10, period=60, key="user")],
+        "DELETE /users/bulk": [RateLimitRule(limit=10, period=60, key="user")],
+    }
+
+    # 是否启用 /metrics 指标采集
+    METRICS_ENABLED: bool = True
+    # 多进程部署时各工作进程共享的指标文件目录(相对项目根目录), serve 启动时清空
+    METRICS_MULTIPROC_DIR: str = ".cache/metrics"
+
+    # 查询日志: 统计每个请求的查询次数与数据库耗时, 记录慢查询及其查询计划, 调试模式下以响应头返回统计
+    QUERY_LOG_ENABLED: bool = True
+    # 慢查询阈值(秒)
+    QUERY_LOG_SLOW_THRESHOLD: float = 0.05
+    # 慢查询日志是否附带查询计划(SQLite EXPLAIN QUERY PLAN, 同一语句只获取一次)
+    QUERY_LOG_EXPLAIN: bool = True
+    # 一次请求中相同语句执行次数达到该值时告警(疑似 N+1 查询)
+    QUERY_LOG_REPEAT_THRESHOLD: int = 10
+
+    # 请求剖析: 超级用户的请求携带 X-Profile 头(speedscope / collapsed / cprofile)时剖析该请求, 以剖析结果作为响应
+    PROFILING_ENABLED: bool = False
+    # 剖析单个请求时的采样间隔(秒)
+    PROFILING_SAMPLE_INTERVAL: float = 0.001
+    # 持续采样: 后台以较低频率采样, 按路由汇总, 每个时间窗口写出一次火焰图数据
+    PROFILING_CONTINUOUS: bool = False
+    PROFILING_CONTINUOUS_INTERVAL: float = 0.02
+    # 持续采样的时间窗口(秒)
+    PROFILING_WINDOW: float = 60
+    # 剖析结果目录(相对项目根目录)及最多保留的文件数
+    PROFILING_DIR: str = "logs/profiles"
+    PROFILING_KEEP_FILES: int = 100
+
+    # 是否启用队列日志(后台线程批量写入, 应用与 uvicorn 共用)
+    LOG_QUEUE_ENABLED: bool = True
+    # 日志队列容量
+    LOG_QUEUE_SIZE: int = 10000
+    # 队列满时的处理策略: drop_new 丢弃新日志, drop_old 丢弃最旧日志, block 阻塞等待
+    LOG_QUEUE_OVERFLOW: Literal["drop_new", "drop_old", "block"] = "drop_new"
+    # 批量写入条数
+    LOG_BATCH_SIZE: int = 256
+    # 最长刷新间隔(秒)
+    LOG_FLUSH_INTERVAL: float = 1.0
+
+    # 是否启用 SQLite 调优参数
+    SQLITE_TUNING: bool = True
+    # 日志模式: WAL 下读写并发
+    SQLITE_JOURNAL_MODE: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    # 同步级别: WAL 下 NORMAL 兼顾安全与写入速度
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # 页缓存大小, 负数表示 KiB
+    SQLITE_CACHE_SIZE: int = -64000
+    # 内存映射大小(字节)
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # 锁等待超时(毫秒)
+    SQLITE_BUSY_TIMEOUT: int = 5000
+
+    # 所有工作进程的连接总数, 每个进程的连接池大小为 总数 // SERVER_WORKERS
+    DATABASE_MAX_CONNECTIONS: int = 20
+    # 连接池溢出连接数
+    DATABASE_MAX_OVERFLOW: int = 10
+    # 获取连接超时(秒)
+    DATABASE_POOL_TIMEOUT: float = 30
+    # GET 路由是否使用独立的只读连接池
+    DATABASE_READ_ONLY_POOL: bool = True
+    # 启用只读连接池时, 每个进程的异步写连接数
+    DATABASE_WRITE_POOL_SIZE: int = 1
+
     @property
     def DATABASE_URL(self) -> str:
         return f"sqlite:///{self.BASE_DIR.joinpath(self.SQLITE_DB_NAME)}?characterEncoding=UTF-8"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"sqlite+aiosqlite:///{self.BASE_DIR.joinpath(self.SQLITE_DB_NAME)}?characterEncoding=UTF-8"
+
+    @property
+    def READ_ONLY_DATABASE_URL(self) -> str:
+        return f"sqlite:///file:{self.BASE_DIR.joinpath(self.SQLITE_DB_NAME)}?mode=ro&uri=true"
+
+    @property
+    def ASYNC_READ_ONLY_DATABASE_URL(self) -> str:
+        return f"sqlite+aiosqlite:///file:{self.BASE_DIR.joinpath(self.SQLITE_DB_NAME)}?mode=ro&uri=true"
+
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()
@@ -1,27 +1,183 @@
 # -*- coding: utf-8 -*-
 
-from collections.abc import Generator
+import asyncio
+from collections.abc import AsyncGenerator
+from typing import Any
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlmodel import create_engine, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.log import logger
 
 from app.core.config import settings
+from app.core.metrics import instrument_pool
+from app.core.querylog import instrument_queries
 
-# 创建数据库引擎，增加连接池配置
-engine = create_engine(url=settings.DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
 
-def get_db() -> Generator[Session, None, None]:
+def engine_options(writer: bool = False) -> dict[str, Any]:
+    """
+    连接池配置: 按工作进程数平分总连接数
+
+    SQLite 同一时刻只允许一个写事务, 启用只读连接池后写连接池收缩为 DATABASE_WRITE_POOL_SIZE,
+    写请求在进程内的连接池排队, 而不是在数据库锁上互相等待直到 database is locked。
+    """
+    if writer and settings.DATABASE_READ_ONLY_POOL:
+        return {
+            "echo": False,
+            "pool_size": settings.DATABASE_WRITE_POOL_SIZE,
+            "max_overflow": 0,
+            "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        }
+    return {
+        "echo": False,
+        "pool_size": max(1, settings.DATABASE_MAX_CONNECTIONS // max(1, settings.SERVER_WORKERS)),
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+    }
+
+
+def register_sqlite_pragmas(engine: Engine, read_only: bool = False) -> None:
+    """在每个新建连接上应用 SQLite 调优参数"""
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # WAL 模式下读写互不阻塞, 该设置会持久化到数据库文件
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+# 创建数据库引擎，增加连接池配置(同步引擎同时供 alembic 迁移使用)
+engine = create_engine(url=settings.DATABASE_URL, connect_args={"check_same_thread": False}, **engine_options())
+
+# 异步数据库引擎(同步会话模式在事件循环线程内阻塞等待连接, 不能收缩连接池, 只对异步写连接池生效)
+async_engine: AsyncEngine = create_async_engine(url=settings.ASYNC_DATABASE_URL, **engine_options(writer=True))
+
+# 只读连接池, 供 GET 路由使用
+if settings.DATABASE_READ_ONLY_POOL:
+    read_engine = create_engine(url=settings.READ_ONLY_DATABASE_URL, connect_args={"check_same_thread": False}, **engine_options())
+    async_read_engine: AsyncEngine = create_async_engine(url=settings.ASYNC_READ_ONLY_DATABASE_URL, **engine_options())
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+if settings.SQLITE_TUNING:
+    register_sqlite_pragmas(engine)
+    register_sqlite_pragmas(async_engine.sync_engine)
+    if settings.DATABASE_READ_ONLY_POOL:
+        register_sqlite_pragmas(read_engine, read_only=True)
+        register_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+
+instrumented_engines = {"sync": engine, "async": async_engine.sync_engine}
+if settings.DATABASE_READ_ONLY_POOL:
+    instrumented_engines.update(sync_read=read_engine, async_read=async_read_engine.sync_engine)
+for name, instrumented_engine in instrumented_engines.items():
+    if settings.METRICS_ENABLED:
+        instrument_pool(instrumented_engine, name)
+    if settings.METRICS_ENABLED or settings.QUERY_LOG_ENABLED:
+        instrument_queries(instrumented_engine, name)
+
+
+class SyncStreamResult:
+    """同步结果的分批迭代包装, 与 AsyncResult.partitions 用法一致"""
+    def __init__(self, result: Any) -> None:
+        self.result = result
+
+    async def partitions(self, size: int | None = None) -> AsyncGenerator[Any, None]:
+        for partition in self.result.partitions(size):
+            yield partition
+
+
+class SyncSessionAdapter:
+    """
+    同步会话适配器: 以 AsyncSession 相同的可等待接口包装同步 Session,
+    使视图层在 DATABASE_ASYNC 开关切换时无需修改代码。
+    """
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def add(self, instance: Any) -> None:
+        self.session.add(instance)
+
+    async def exec(self, statement: Any, **kwargs: Any) -> Any:
+        return self.session.exec(statement, **kwargs)
+
+    async def stream(self, statement: Any, **kwargs: Any) -> SyncStreamResult:
+        return SyncStreamResult(self.session.execute(statement, **kwargs))
+
+    async def get(self, entity: Any, ident: Any) -> Any:
+        return self.session.get(entity, ident)
+
+    async def commit(self) -> None:
+        self.session.commit()
+
+    async def rollback(self) -> None:
+        self.session.rollback()
+
+    async def refresh(self, instance: Any) -> None:
+        self.session.refresh(instance)
+
+    async def delete(self, instance: Any) -> None:
+        self.session.delete(instance)
+
+    async def close(self) -> None:
+        self.session.close()
+
+
+async def get_db() -> AsyncGenerator[AsyncSession | SyncSessionAdapter, None]:
     """获取数据库会话连接"""
-    with Session(bind=engine) as session:
-        yield session
+    if settings.DATABASE_ASYNC:
+        async with AsyncSession(bind=async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(bind=engine) as session:
+            yield SyncSessionAdapter(session)
+
+async def get_read_db() -> AsyncGenerator[AsyncSession | SyncSessionAdapter, None]:
+    """获取只读数据库会话连接"""
+    if settings.DATABASE_ASYNC:
+        async with AsyncSession(bind=async_read_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(bind=read_engine) as session:
+            yield SyncSessionAdapter(session)
+
+
+async def warm_up_pools(connections: int) -> None:
+    """预先建立连接(执行连接时的 PRAGMA 设置)并归还连接池, 每个连接池不超过其容量"""
+    if settings.DATABASE_ASYNC:
+        for pool_engine in {async_engine, async_read_engine}:
+            opened = [await pool_engine.connect() for _ in range(min(connections, pool_engine.pool.size()))]
+            for connection in opened:
+                await connection.exec_driver_sql("SELECT 1")
+                await connection.close()
+        return
+
+    def connect_all() -> None:
+        for pool_engine in {engine, read_engine}:
+            opened = [pool_engine.connect() for _ in range(min(connections, pool_engine.pool.size()))]
+            for connection in opened:
+                connection.exec_driver_sql("SELECT 1")
+                connection.close()
+
+    await asyncio.to_thread(connect_all)
+
 
 async def create_db_and_tables() -> None:
     from app.model.user import User
-    with Session(bind=engine) as session:
-        admin_user: User | None = session.exec(select(User).where(User.username == "admin")).first()
+    from app.core.security import password_hasher
+    async for session in get_db():
+        admin_user: User | None = (await session.exec(select(User).where(User.username == "admin"))).first()
         if not admin_user:
-            admin: User = User(name="管理员", username="admin", password="123456", description="管理员", is_superuser=True)
-            session.add(instance=admin)
-            session.commit()
+            admin: User = User(name="管理员", username="admin", password=await password_hasher.hash("123456"), description="管理员", is_superuser=True)
+            session.add(admin)
+            await session.commit()
             logger.info("管理员账号初始化成功")
         else:
             logger.info("管理员用户已存在, 无需创建")
@@ -11,7 +11,7 @@ def register_exception_handler(app: FastAPI) -> None:
     async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
         """请求异常处理器"""
         logger.error(f"请求地址: {request.url}, 错误详情: {exc.detail}")
-        return JSONResponse(status_code=exc.status_code, content=exc.detail)
+        return JSONResponse(status_code=exc.status_code, content=exc.detail, headers=exc.headers)
 
     @app.exception_handler(exc_class_or_status_code=RequestValidationError)
     async def request_validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+async def iter_csv(columns: Sequence[str], partitions: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[bytes]:
+    """按批将行序列化为 CSV, 首行为表头, 以 BOM 开头便于 Excel 识别编码"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")
+    writer.writerow(columns)
+    async for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def iter_jsonl(columns: Sequence[str], partitions: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[bytes]:
+    """按批将行序列化为 JSON Lines"""
+    async for rows in partitions:
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows).encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """边生成边压缩为 gzip 格式"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,12 +1,196 @@
 # -*- coding: utf-8 -*-
 
+import atexit
 import logging
+import os
+import queue
+import threading
+import time
 from datetime import date
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, TimedRotatingFileHandler
+from pathlib import Path
 
 from app.core.config import settings
 
 
+class DailyFileHandler(logging.Handler):
+    """
+    按日期分文件的批量写入处理器
+
+    文件以追加模式打开, 每次刷新用一次 os.write 写入整批日志, 多个工作进程写同一目录时不会互相截断;
+    跨天时直接切换到新日期的文件, 不做重命名, 避免多进程同时轮转导致的日志丢失。
+    """
+
+    def __init__(self, log_path: Path, backup_count: int, encoding: str = "utf-8") -> None:
+        super().__init__()
+        self.log_path = log_path
+        self.backup_count = backup_count
+        self.encoding = encoding
+        # (日志记录, 格式化后的文本), 写入失败时把批次的首条记录交给 handleError
+        self.buffer: list[tuple[logging.LogRecord, str]] = []
+        self.fd: int | None = None
+        self.current_date: date | None = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.buffer.append((record, self.format(record) + "\n"))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, []
+            try:
+                os.write(self._open(), "".join(line for _, line in batch).encode(self.encoding))
+            except OSError:
+                self.handleError(batch[0][0])
+
+    def _open(self) -> int:
+        today = date.today()
+        if self.fd is None or today != self.current_date:
+            self._close_fd()
+            filename = self.log_path.joinpath(today.strftime(r"%Y-%m-%d.log"))
+            self.fd = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.current_date = today
+            self._cleanup()
+        return self.fd
+
+    def _cleanup(self) -> None:
+        """只保留最近 backup_count 天的日志文件"""
+        files = sorted(self.log_path.glob("????-??-??.log*"), reverse=True)
+        for file in files[self.backup_count + 1:]:
+            file.unlink(missing_ok=True)
+
+    def _close_fd(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def close(self) -> None:
+        self.flush()
+        with self.lock:
+            self._close_fd()
+        super().close()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    有界队列处理器, 队列满时按溢出策略处理:
+    drop_new 丢弃新日志, drop_old 丢弃最旧日志, block 阻塞等待
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop_new") -> None:
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 队列仅在进程内使用, 无需序列化, 格式化工作全部交给后台线程
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.overflow == "drop_old":
+                try:
+                    dropped = self.queue.get_nowait()
+                    if isinstance(dropped, threading.Event):
+                        # 丢弃的是刷新请求, 直接通知等待方, 避免其等到超时
+                        dropped.set()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+class LogQueueListener:
+    """后台日志写入线程: 从队列批量取出日志交给处理器, 按批次大小或时间间隔刷新"""
+
+    _sentinel = object()
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        queue_handler: BoundedQueueHandler,
+        handlers: list[logging.Handler],
+        batch_size: int,
+        flush_interval: float,
+    ) -> None:
+        self.queue = log_queue
+        self.queue_handler = queue_handler
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-queue-listener", daemon=True)
+        self._thread.start()
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _flush(self) -> None:
+        dropped, self.queue_handler.dropped = self.queue_handler.dropped, 0
+        if dropped:
+            self._handle(logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"日志队列已满, 丢弃 {dropped} 条日志",
+            }))
+        for handler in self.handlers:
+            handler.flush()
+
+    def _run(self) -> None:
+        pending = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                record = None
+            if record is self._sentinel:
+                break
+            if isinstance(record, logging.LogRecord):
+                self._handle(record)
+                pending += 1
+            # 刷新请求按入队顺序取出, 此时之前入队的日志均已处理
+            flush_request = record if isinstance(record, threading.Event) else None
+            if record is None or flush_request or pending >= self.batch_size or time.monotonic() >= deadline:
+                self._flush()
+                pending = 0
+                deadline = time.monotonic() + self.flush_interval
+            if flush_request:
+                flush_request.set()
+        self._flush()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """等待队列中已有的日志全部写出"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        # 刷新请求与日志共用队列, 后台线程取到该请求时写出并通知
+        flushed = threading.Event()
+        try:
+            self.queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return
+        flushed.wait(timeout)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+
 class LoggerHandler:
     """日志处理器类，用于配置和管理日志"""
 
@@ -21,13 +205,16 @@ class LoggerHandler:
             "%(asctime)s - %(levelname)s - [%(name)s:%(filename)s:%(funcName)s:%(lineno)d] %(message)s"
         )
         self.log_level: str = "INFO"
-        
-        
+
+
         self.when = "MIDNIGHT"
         self.interval = 1
         self.backup_count = 10
         self.encoding = "utf-8"
 
+        self.queue_handler: BoundedQueueHandler | None = None
+        self.listener: LogQueueListener | None = None
+
         self.logger = logging.getLogger(__name__)
         self._configure_logger()
 
@@ -43,6 +230,11 @@ class LoggerHandler:
             # 配置日志格式
             self.formatter = logging.Formatter(fmt=self.log_format)
 
+            if settings.LOG_QUEUE_ENABLED:
+                self._configure_queue()
+                self.logger.addHandler(self.queue_handler)
+                return
+
             # 配置文件处理器
             file_handler = TimedRotatingFileHandler(
                 filename=self.filename,
@@ -63,16 +255,73 @@ class LoggerHandler:
         except Exception as e:
             self.logger.error(f"日志配置失败: {e}")
 
+    def _configure_queue(self) -> None:
+        """配置队列日志: 应用与 uvicorn 日志共用一个有界队列和一个后台写入线程"""
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.queue_handler = BoundedQueueHandler(log_queue, overflow=settings.LOG_QUEUE_OVERFLOW)
+
+        file_handler = DailyFileHandler(log_path=self.log_path, backup_count=self.backup_count, encoding=self.encoding)
+        file_handler.setLevel(self.log_level)
+        file_handler.setFormatter(self.formatter)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(self.log_level)
+        console_handler.setFormatter(self.formatter)
+
+        self.listener = LogQueueListener(
+            log_queue=log_queue,
+            queue_handler=self.queue_handler,
+            handlers=[file_handler, console_handler],
+            batch_size=settings.LOG_BATCH_SIZE,
+            flush_interval=settings.LOG_FLUSH_INTERVAL,
+        )
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def flush(self) -> None:
+        """刷新队列中尚未写出的日志"""
+        if self.listener:
+            self.listener.flush()
+
     def __enter__(self) -> logging.Logger:
         """上下文管理器入口"""
         return self.logger
 
     def _uvicorn_logger(self) -> dict:
         """配置uvicorn日志处理器
-        
+
         Returns:
             dict: uvicorn日志配置字典
         """
+        if self.queue_handler:
+            # uvicorn 日志写入同一个队列, 由后台线程统一格式化输出
+            return {
+                "version": 1,
+                "disable_existing_loggers": False,
+                "handlers": {
+                    "queue": {
+                        "()": "app.core.log.get_queue_handler",
+                    },
+                },
+                "loggers": {
+                    "uvicorn": {
+                        "handlers": ["queue"],
+                        "level": self.log_level,
+                        "propagate": False,
+                    },
+                    "uvicorn.error": {
+                        "handlers": ["queue"],
+                        "level": self.log_level,
+                        "propagate": False,
+                    },
+                    "uvicorn.access": {
+                        "handlers": ["queue"],
+                        "level": self.log_level,
+                        "propagate": False,
+                    },
+                },
+            }
+
         return {
             "version": 1,
             "disable_existing_loggers": False,
@@ -128,6 +377,12 @@ class LoggerHandler:
         }
 
 
+def get_queue_handler() -> logging.Handler:
+    """供 uvicorn 日志配置引用的共享队列处理器"""
+    return log_handler.queue_handler
+
+
 # 全局日志实例
-logger = LoggerHandler().logger
-uvicorn_logger = LoggerHandler()._uvicorn_logger
+log_handler = LoggerHandler()
+logger = log_handler.logger
+uvicorn_logger = log_handler._uvicorn_logger
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import os
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy import Engine, event
+
+# prometheus_client 在导入时根据该环境变量决定是否使用多进程共享文件, 此处与其保持一致
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# 请求耗时分桶(秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# 查询与模板渲染耗时分桶(秒)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "请求数", ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "请求耗时", ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "处理中的请求数", ["method"], multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "准入控制放行、处理中的请求数", multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "准入控制排队中的请求数", multiprocess_mode="livesum",
+)
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "准入控制拒绝的请求数", ["reason", "priority"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "数据库查询耗时(_count 即查询次数)", ["engine", "operation"], buckets=FAST_BUCKETS,
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "慢查询次数", ["engine", "method", "route"],
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "每个请求执行的查询数", ["method", "route"], buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "每个请求的数据库耗时", ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "连接池容量", ["engine"], multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "已借出的连接数", ["engine"], multiprocess_mode="livesum",
+)
+CACHE_HITS = Counter(
+    "cache_hits_total", "缓存命中次数", ["namespace"],
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total", "缓存未命中次数", ["namespace"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total", "缓存失效次数", ["namespace"],
+)
+TEMPLATE_RENDER_DURATION = Histogram(
+    "template_render_duration_seconds", "模板渲染耗时", ["template"], buckets=FAST_BUCKETS,
+)
+
+
+def route_label(scope: dict[str, Any], root_path: str) -> str:
+    """
+    请求的路由模板(如 /user/{id}), 避免按原始路径产生无限多的标签值;
+    挂载的子应用(静态文件)使用挂载前缀, 未匹配的请求统一归为 unmatched。
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        return scope["root_path"][len(root_path):]
+    return "unmatched"
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """通过连接池事件统计连接池占用, 查询耗时由 querylog.instrument_queries 统计"""
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        DB_POOL_CHECKED_OUT.labels(name).inc()
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        DB_POOL_CHECKED_OUT.labels(name).dec()
+
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.labels(name).set(size() + max(0, getattr(engine.pool, "_max_overflow", 0)))
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    生成 Prometheus 文本格式指标
+
+    多进程部署时各工作进程把指标写入 PROMETHEUS_MULTIPROC_DIR 下的共享文件, 采集时合并全部进程的数据,
+    任意一个工作进程响应 /metrics 都能得到完整结果。
+    """
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """工作进程退出时清理其实时指标(处理中请求数、连接池占用)"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
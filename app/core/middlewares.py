@@ -1,14 +1,47 @@
 # -*- coding: utf-8 -*-
 
+import json
+import random
 import time
-from fastapi import FastAPI, status, HTTPException
+import zlib
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.requests import Request
-from starlette.responses import Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.admission import admission, request_priority
+from app.core.auth import identify
+from app.core.config import settings
 from app.core.log import logger
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, HTTP_REQUESTS_IN_PROGRESS, route_label
+from app.core.profiler import PROFILE_MODES, continuous_profiler, profile_request
+from app.core.querylog import RequestQueries, current_queries, finish_request
+
+try:
+    # 可选依赖, 安装后优先使用 brotli / zstd 压缩
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 允许压缩的响应类型, 图片、字体、gzip 文件等本身已压缩的类型不在其中
+COMPRESSIBLE_TYPES = frozenset({
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+})
 
 
 class CustomCORSMiddleware(CORSMiddleware):
@@ -23,47 +56,324 @@ class CustomCORSMiddleware(CORSMiddleware):
         )
 
 
-class RequestLogMiddleware(BaseHTTPMiddleware):
+class RequestLogMiddleware:
     """
-    记录请求日志中间件: 提供一个基础的中间件类，允许你自定义请求和响应处理逻辑。
+    记录请求日志中间件: 纯 ASGI 实现, 不经过 BaseHTTPMiddleware 的任务/流包装,
+    每个请求只输出一条结构化日志, 成功请求按 ACCESS_LOG_SAMPLE_RATE 采样, 失败请求全部记录。
     """
-    def __init__(self, app: ASGIApp) -> None:
-        super().__init__(app)
-
-    async def dispatch(
-            self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        start_time: float = time.time()
-        
-        logger.info(
-            f"请求来源: {request.client.host if request.client else '未知'}, "
-            f"请求方法: {request.method}, "
-            f"请求路径: {request.url.path}, "
-        )
-        
+    def __init__(self, app: ASGIApp, sample_rate: float | None = None) -> None:
+        self.app = app
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time: int = time.perf_counter_ns()
+        status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR
+        content_length: str = "0"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, content_length
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(round((time.perf_counter_ns() - start_time) / 1e9, 5)))
+                content_length = headers.get("content-length", "0")
+            await send(message)
+
         try:
-            response: Response = await call_next(request)
-            process_time: float = round(time.time() - start_time, 5)
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            if response.status_code == status.HTTP_200_OK:
-                logger.info(
-                    f"请求成功: {response.status_code},"
-                    f"响应内容长度: {response.headers.get('content-length', '0')}, "
-                    f"处理时间: {process_time}s"
-                )
-            else:
-                logger.error(
-                    f"请求失败: {response.status_code},"
-                    f"响应内容长度: {response.headers.get('content-length', '0')}, "
-                    f"处理时间: {process_time}s,"
-                )
-            return response
-        
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            logger.error(f"系统异常: {str(e)}")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"系统异常，请联系管理员: {str(e)}")
+            self.log(scope, status.HTTP_500_INTERNAL_SERVER_ERROR, content_length, start_time, error=str(e))
+            raise
+        else:
+            self.log(scope, status_code, content_length, start_time)
+
+    def log(self, scope: Scope, status_code: int, content_length: str, start_time: int, error: str | None = None) -> None:
+        """输出单条结构化请求日志"""
+        failed = error is not None or status_code >= status.HTTP_400_BAD_REQUEST
+        if not failed and (self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate)):
+            return
+
+        client = scope.get("client")
+        record = {
+            "client": client[0] if client else "未知",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "length": int(content_length) if content_length.isdigit() else 0,
+            "duration_ms": round((time.perf_counter_ns() - start_time) / 1e6, 3),
+        }
+        if error is not None:
+            record["error"] = error
+        message = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        if failed:
+            logger.error(message, extra={"access": record})
+        else:
+            logger.info(message, extra={"access": record})
+
+class MetricsMiddleware:
+    """请求指标中间件: 按路由模板统计请求数、耗时分布及处理中的请求数, 不采样"""
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope["method"]
+        root_path: str = scope.get("root_path", "")
+        status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 路由匹配后 scope 中才有路由信息
+            route = route_label(scope, root_path)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start_time)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            in_progress.dec()
+
+
+class QueryLogMiddleware:
+    """
+    查询统计中间件: 统计每个请求执行的查询次数与数据库耗时, 请求结束后按路由记录并检查 N+1 查询;
+    调试模式下以 X-DB-Query-Count / X-DB-Time 响应头返回(统计到响应开始发送为止)。
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(queries.count)
+                headers["X-DB-Time"] = f"{queries.duration:.6f}"
+            await send(message)
+
+        token = current_queries.set(queries)
+        try:
+            await self.app(scope, receive, send_wrapper if settings.DEBUG else send)
+        finally:
+            current_queries.reset(token)
+            finish_request(queries)
+
+
+class ProfilingMiddleware:
+    """
+    性能剖析中间件: 启用 PROFILING_ENABLED 时, 超级用户携带 X-Profile 头的请求被剖析, 以剖析结果作为响应;
+    持续采样运行时登记请求所在的任务, 供采样线程按路由归属样本。
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = Headers(scope=scope).get("x-profile") if settings.PROFILING_ENABLED else None
+        with continuous_profiler.track(scope):
+            if mode in PROFILE_MODES:
+                # 非超级用户的剖析头直接忽略, 不暴露剖析功能是否开启
+                identity = await identify(Request(scope))
+                if identity is not None and identity.is_superuser:
+                    await profile_request(self.app, scope, receive, send, mode)
+                    return
+            await self.app(scope, receive, send)
+
+
+class AdmissionControlMiddleware:
+    """
+    准入控制中间件: 超出处理上限的请求按路径优先级排队, 队列已满或等待超时立即返回 503 和 Retry-After,
+    放行的请求在响应发送完毕(含流式响应)后才归还名额。
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not admission.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        if not await admission.acquire(request_priority(scope["path"])):
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content="服务繁忙, 请稍后重试",
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+
+class GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # 非最后一块时同步刷新, 使已生成的内容立即发送给客户端
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        self.compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self.compressor.process(data) + (self.compressor.finish() if final else self.compressor.flush())
+
+
+class ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self.compressor.compress(data) + self.compressor.flush(mode)
+
+
+# 可用的编码, 按优先级排列
+ENCODERS = {
+    name: encoder
+    for name, encoder, available in [
+        ("br", BrotliEncoder, brotli is not None),
+        ("zstd", ZstdEncoder, zstandard is not None),
+        ("gzip", GzipEncoder, True),
+    ]
+    if available
+}
+
+
+def select_encoding(accept_encoding: str) -> str | None:
+    """按服务端优先级选择客户端接受的编码, 忽略 q=0 的编码"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        try:
+            if params and float(params.strip().removeprefix("q=")) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip())
+    for name in ENCODERS:
+        if name in accepted or "*" in accepted:
+            return name
+    return None
+
+
+class CompressionMiddleware:
+    """
+    响应压缩中间件: 纯 ASGI 实现, 按 Accept-Encoding 选择 br / zstd / gzip。
+
+    等到首个响应体再决定是否压缩: 一次性发送且小于 COMPRESSION_MINIMUM_SIZE 的响应原样返回,
+    一次性发送的响应压缩后保留 Content-Length, 流式响应逐块压缩并立即发送, 不缓冲完整响应体。
+    已带 Content-Encoding(如预压缩的静态文件)或类型不在允许列表中的响应直接透传。
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int | None = None, gzip_level: int | None = None) -> None:
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope["type"] == "http" and scope["method"] != "HEAD":
+            encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 待定的响应头消息, 为 None 表示透传
+        start_message: Message | None = None
+        encoder = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, encoder
+            if message["type"] == "http.response.start":
+                if self.should_compress(message):
+                    start_message = message
+                else:
+                    await send(message)
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            body: bytes = message.get("body", b"")
+            more_body: bool = message.get("more_body", False)
+            if encoder is None:
+                if message["type"] != "http.response.body" or (not more_body and len(body) < self.minimum_size):
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding](self.gzip_level)
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # 压缩后的内容与原内容字节不同, 强 ETag 降级为弱 ETag
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = encoder.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": encoder.compress(body, final=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def should_compress(message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return (
+            message["status"] not in (status.HTTP_204_NO_CONTENT, status.HTTP_304_NOT_MODIFIED)
+            and "content-encoding" not in headers
+            and media_type in COMPRESSIBLE_TYPES
+            and "no-transform" not in headers.get("cache-control", "")
+        )
+
 
 def register_middleware_handler(app: FastAPI) -> None:
+    # 后注册的在外层: 压缩位于最内层, 请求日志记录的耗时与长度均为压缩后的结果;
+    # 准入控制位于 CORS 之内, 被拒绝的请求同样带有跨域响应头, 并计入指标和请求日志
+    app.add_middleware(middleware_class=CompressionMiddleware)
+    app.add_middleware(middleware_class=AdmissionControlMiddleware)
     app.add_middleware(middleware_class=CustomCORSMiddleware)
+    if settings.QUERY_LOG_ENABLED:
+        app.add_middleware(middleware_class=QueryLogMiddleware)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(middleware_class=MetricsMiddleware)
+    # 剖析位于指标与准入控制之外, 剖析结果包含除请求日志外的全部中间件
+    if settings.PROFILING_ENABLED or settings.PROFILING_CONTINUOUS:
+        app.add_middleware(middleware_class=ProfilingMiddleware)
     app.add_middleware(middleware_class=RequestLogMiddleware)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+from typing import Any
+from sqlalchemy import tuple_
+from sqlmodel import asc, desc
+
+
+def encode_cursor(value: Any, id: int, direction: str = "next") -> str:
+    """
+    生成不透明游标
+    
+    Args:
+        value: 排序字段的值
+        id: 主键(同值时的次序依据)
+        direction: 翻页方向, next 或 prev
+    """
+    raw = json.dumps({"v": value, "id": id, "d": direction}, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int, str]:
+    """
+    解析游标, 格式错误时抛出 ValueError
+    
+    Returns:
+        tuple: (排序字段的值, 主键, 翻页方向)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw.decode("utf-8"))
+        value, id, direction = data["v"], int(data["id"]), data["d"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+    if direction not in ("next", "prev"):
+        raise ValueError(f"无效的游标方向: {direction}")
+    return value, id, direction
+
+
+def keyset_paginate(sql: Any, column: Any, id_column: Any, descending: bool, cursor: str | None, limit: int) -> tuple[Any, bool]:
+    """
+    基于 (排序字段, 主键) 的键集分页, 取 limit + 1 行用于判断是否还有数据
+    
+    Args:
+        sql: 已带过滤条件的查询
+        column: 排序字段(不可为空)
+        id_column: 主键字段
+        descending: 是否倒序
+        cursor: 游标, 为空时从第一页开始
+        limit: 每页数量
+    
+    Returns:
+        tuple: (分页查询, 是否向前翻页), 向前翻页时结果需要调用方反转
+    """
+    backward = False
+    if cursor:
+        value, id, direction = decode_cursor(cursor)
+        backward = direction == "prev"
+        # 向后翻页且正序, 或向前翻页且倒序时取更大的键
+        if descending == backward:
+            sql = sql.where(tuple_(column, id_column) > tuple_(value, id))
+        else:
+            sql = sql.where(tuple_(column, id_column) < tuple_(value, id))
+
+    order_func = desc if descending != backward else asc
+    if column is id_column:
+        sql = sql.order_by(order_func(id_column))
+    else:
+        sql = sql.order_by(order_func(column), order_func(id_column))
+    return sql.limit(limit + 1), backward
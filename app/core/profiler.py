@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import cProfile
+import io
+import json
+import linecache
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType, FrameType
+
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.log import logger
+from app.core.metrics import route_label
+
+# X-Profile 请求头可选的剖析方式
+PROFILE_MODES = ("speedscope", "collapsed", "cprofile")
+# 线程空闲等待时位于栈顶的函数: (文件名, 函数名) -> 等待所在源码行包含的文本(None 表示整个函数), 这类样本不计入
+IDLE_FRAMES: dict[tuple[str, str], str | None] = {
+    # 事件循环等待 IO
+    ("selectors.py", "select"): None,
+    # 条件变量、队列等待(日志线程、anyio 工作线程)
+    ("threading.py", "wait"): None,
+    # 线程池等待任务
+    ("thread.py", "_worker"): None,
+    # aiosqlite 连接线程等待任务, 执行 SQL 时栈顶同样是该函数, 按所在行区分
+    ("core.py", "_connection_worker_thread"): "tx.get()",
+}
+# cprofile 方式返回的函数条数
+PSTATS_LIMIT = 80
+
+_frame_labels: dict[CodeType, str] = {}
+_path_prefixes: list[str] = []
+_idle_lines: dict[tuple[CodeType, int], bool] = {}
+
+
+def is_idle(frame: FrameType) -> bool:
+    """线程的栈顶帧是否处于空闲等待"""
+    code = frame.f_code
+    key = (os.path.basename(code.co_filename), code.co_name)
+    if key not in IDLE_FRAMES:
+        return False
+    text = IDLE_FRAMES[key]
+    if text is None:
+        return True
+    idle = _idle_lines.get((code, frame.f_lineno))
+    if idle is None:
+        idle = _idle_lines[(code, frame.f_lineno)] = text in linecache.getline(code.co_filename, frame.f_lineno)
+    return idle
+
+
+def frame_label(code: CodeType) -> str:
+    """函数名 (相对路径:首行号), 路径去掉 sys.path 中的前缀, 同一函数的样本合并为一个节点"""
+    label = _frame_labels.get(code)
+    if label is None:
+        if not _path_prefixes:
+            _path_prefixes.extend(sorted({os.path.join(os.path.abspath(path), "") for path in sys.path if path}, key=len, reverse=True))
+        filename = code.co_filename
+        prefix = next((prefix for prefix in _path_prefixes if filename.startswith(prefix)), "")
+        label = _frame_labels[code] = f"{code.co_name} ({filename[len(prefix):]}:{code.co_firstlineno})"
+    return label
+
+
+def thread_name(thread_id: int) -> str:
+    thread = next((thread for thread in threading.enumerate() if thread.ident == thread_id), None)
+    return thread.name if thread is not None else str(thread_id)
+
+
+class StackProfile:
+    """采样结果: 分组(线程或路由) -> 调用栈(由外到内) -> 样本数"""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: defaultdict[str, Counter[tuple[str, ...]]] = defaultdict(Counter)
+        self.samples = 0
+
+    def add(self, group: str, stack: tuple[str, ...]) -> None:
+        self.stacks[group][stack] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """flamegraph.pl、speedscope 等工具通用的 collapsed 格式, 分组作为根节点"""
+        return "".join(
+            f"{';'.join((group, *stack))} {count}\n"
+            for group, counter in sorted(self.stacks.items())
+            for stack, count in counter.most_common()
+        )
+
+    def speedscope(self, name: str) -> dict:
+        """speedscope 文件格式, 每个分组一个 profile, 耗时按采样间隔估算"""
+        frames: dict[str, int] = {}
+        profiles = []
+        for group, counter in sorted(self.stacks.items(), key=lambda item: -sum(item[1].values())):
+            samples = [[frames.setdefault(label, len(frames)) for label in stack] for stack in counter]
+            weights = [count * self.interval for count in counter.values()]
+            profiles.append({
+                "type": "sampled",
+                "name": group,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "fastapi_jinja2",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": label} for label in frames]},
+            "profiles": profiles,
+        }
+
+
+class StackSampler:
+    """
+    调用栈采样器: 后台线程按固定间隔读取各线程当前的调用栈(sys._current_frames), 跳过空闲线程,
+    由 group 决定样本的分组(返回 None 丢弃)。只依赖标准库, 不修改被采样的代码, 开销只与采样频率有关。
+    """
+
+    def __init__(self, interval: float, group: Callable[[int], str | None]) -> None:
+        self.interval = interval
+        self.group = group
+        self.profile = StackProfile(interval)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> StackProfile:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.profile
+
+    def take(self) -> StackProfile:
+        """取出当前结果并重新开始统计"""
+        profile, self.profile = self.profile, StackProfile(self.interval)
+        return profile
+
+    def sample(self, own: int) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or is_idle(frame):
+                continue
+            group = self.group(thread_id)
+            if group is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            self.profile.add(group, tuple(reversed(stack)))
+
+    def tick(self, final: bool) -> None:
+        """每次采样后在采样线程中调用, 采样结束时 final 为 True"""
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(own)
+            self.tick(final=False)
+        self.tick(final=True)
+
+
+def profile_path(name: str, suffix: str) -> Path:
+    """剖析结果文件路径, 文件名以时间开头, 按名称排序即按时间排序"""
+    directory = settings.BASE_DIR.joinpath(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^0-9A-Za-z_.-]+", "_", name).strip("_") or "root"
+    return directory.joinpath(f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{slug}{suffix}")
+
+
+def prune_profiles() -> None:
+    """只保留最新的 PROFILING_KEEP_FILES 个结果文件, 0 表示不清理"""
+    if settings.PROFILING_KEEP_FILES <= 0:
+        return
+    paths = sorted(settings.BASE_DIR.joinpath(settings.PROFILING_DIR).iterdir())
+    for path in paths[:-settings.PROFILING_KEEP_FILES]:
+        path.unlink(missing_ok=True)
+
+
+class ContinuousProfiler(StackSampler):
+    """
+    持续采样: 事件循环线程的样本按当前任务所处理请求的路由分组, 其他线程(线程池、aiosqlite)的样本归入"其他线程";
+    每个时间窗口写出一次 collapsed 与 speedscope 文件, 路由为火焰图的根节点, speedscope 中每个路由一个 profile。
+
+    请求任务由 ProfilingMiddleware 登记, 请求中另起的子任务(如流式响应)归入"未归属",
+    不在任何任务中的回调(协议解析等)归入"事件循环"。
+    """
+
+    def __init__(self, interval: float, window: float) -> None:
+        super().__init__(interval, self.route_of)
+        self.window = window
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.loop_thread: int | None = None
+        # 请求任务 -> (scope, 挂载前缀)
+        self.tasks: dict[asyncio.Task, tuple[Scope, str]] = {}
+        self.window_started = time.monotonic()
+
+    def start(self) -> None:
+        """在事件循环线程中调用"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.window_started = time.monotonic()
+        super().start()
+        logger.info(f"持续采样已启动: 间隔 {self.interval * 1000:.0f}ms, 窗口 {self.window:.0f}s")
+
+    @contextmanager
+    def track(self, scope: Scope) -> Iterator[None]:
+        """登记当前任务正在处理的请求"""
+        if not self.running:
+            yield
+            return
+        task = asyncio.current_task()
+        self.tasks[task] = (scope, scope.get("root_path", ""))
+        try:
+            yield
+        finally:
+            self.tasks.pop(task, None)
+
+    def route_of(self, thread_id: int) -> str:
+        if thread_id != self.loop_thread:
+            return "(其他线程)"
+        task = asyncio.current_task(self.loop)
+        if task is None:
+            return "(事件循环)"
+        entry = self.tasks.get(task)
+        if entry is None:
+            return "(未归属)"
+        scope, root_path = entry
+        return f"{scope['method']} {route_label(scope, root_path)}"
+
+    def tick(self, final: bool) -> None:
+        now = time.monotonic()
+        if not final and now - self.window_started < self.window:
+            return
+        self.window_started = now
+        profile = self.take()
+        if not profile.samples:
+            return
+        try:
+            profile_path("continuous", ".collapsed").write_text(profile.collapsed(), encoding="utf-8")
+            speedscope = profile.speedscope(f"持续采样 进程 {os.getpid()}")
+            profile_path("continuous", ".speedscope.json").write_text(json.dumps(speedscope, ensure_ascii=False), encoding="utf-8")
+            prune_profiles()
+        except OSError:
+            logger.exception("写入持续采样结果失败")
+
+
+_profiling = False
+
+
+async def profile_request(app: ASGIApp, scope: Scope, receive: Receive, send: Send, mode: str) -> None:
+    """
+    剖析单个请求: 原响应不发送, 改为返回剖析结果(同时写入 PROFILING_DIR), X-Profile-Status 为原响应状态码。
+
+    speedscope / collapsed 为采样方式, 覆盖所有非空闲线程(按线程分组); cprofile 为确定性统计,
+    只覆盖事件循环线程。两者都会计入同一时刻并发请求的执行, 应在低负载时使用。
+    每个进程同一时刻只剖析一个请求, 其余带剖析头的请求照常处理。
+    """
+    global _profiling
+    if _profiling:
+        await app(scope, receive, send)
+        return
+
+    status_code = 500
+
+    async def capture(message: Message) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    _profiling = True
+    start_time = time.perf_counter()
+    try:
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await app(scope, receive, capture)
+            finally:
+                profiler.disable()
+        else:
+            # 采样线程需要及时拿到 GIL, 剖析期间把线程切换间隔(默认 5ms)缩短到采样间隔
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(switch_interval, settings.PROFILING_SAMPLE_INTERVAL))
+            sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL, thread_name)
+            sampler.start()
+            try:
+                await app(scope, receive, capture)
+            finally:
+                profile = sampler.stop()
+                sys.setswitchinterval(switch_interval)
+    finally:
+        _profiling = False
+    elapsed = time.perf_counter() - start_time
+
+    name = f"{scope['method']} {scope['path']}"
+    headers = {
+        "X-Profile-Status": str(status_code),
+        "X-Profile-Duration": f"{elapsed:.6f}",
+        "Cache-Control": "no-store",
+    }
+    if mode == "cprofile":
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PSTATS_LIMIT)
+        content, media_type = stream.getvalue(), "text/plain"
+        path = profile_path(name, ".prof")
+        await run_in_threadpool(profiler.dump_stats, path)
+    else:
+        if mode == "speedscope":
+            content, media_type = json.dumps(profile.speedscope(name), ensure_ascii=False), "application/json"
+            path = profile_path(name, ".speedscope.json")
+        else:
+            content, media_type = profile.collapsed(), "text/plain"
+            path = profile_path(name, ".collapsed")
+        await run_in_threadpool(path.write_text, content, encoding="utf-8")
+        headers["X-Profile-Samples"] = str(profile.samples)
+    await run_in_threadpool(prune_profiles)
+    headers["X-Profile-File"] = path.name
+
+    logger.info(f"请求剖析完成: {name}, 方式 {mode}, 耗时 {elapsed * 1000:.1f}ms, 结果 {path}")
+    response = Response(content=content, media_type=media_type, headers=headers)
+    await response(scope, receive, send)
+
+
+# 全局持续采样器(每个工作进程一个), 由 lifespan 按 PROFILING_CONTINUOUS 启停
+continuous_profiler = ContinuousProfiler(
+    interval=settings.PROFILING_CONTINUOUS_INTERVAL,
+    window=settings.PROFILING_WINDOW,
+)
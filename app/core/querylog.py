@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.types import Scope
+
+from app.core.config import settings
+from app.core.log import logger
+from app.core.metrics import (
+    DB_QUERY_DURATION,
+    DB_SLOW_QUERIES,
+    HTTP_REQUEST_DB_DURATION,
+    HTTP_REQUEST_DB_QUERIES,
+    route_label,
+)
+
+# 统计的语句类型, 其余(PRAGMA、BEGIN 等)归为 OTHER
+OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"})
+# 查询计划缓存及 N+1 告警去重记录的上限
+CACHE_SIZE = 256
+# 日志中语句的最大长度(批量写入的语句可能很长)
+STATEMENT_LOG_LENGTH = 2000
+
+
+class RequestQueries:
+    """单个请求执行的查询: 次数、数据库耗时及每条语句的执行次数"""
+
+    __slots__ = ("scope", "root_path", "count", "duration", "statements")
+
+    def __init__(self, scope: Scope) -> None:
+        self.scope = scope
+        self.root_path: str = scope.get("root_path", "")
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def route(self) -> str:
+        # 路由匹配后 scope 中才有路由信息, 查询都发生在匹配之后
+        return route_label(self.scope, self.root_path)
+
+    def add(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] += 1
+
+
+# 当前请求的查询统计, 由 QueryLogMiddleware 设置; 异步引擎的 greenlet 与线程池都沿用请求的上下文
+current_queries: ContextVar[RequestQueries | None] = ContextVar("current_queries", default=None)
+
+_plans: OrderedDict[str, str] = OrderedDict()
+_warned: set[tuple[str, str]] = set()
+
+
+def statement_operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    operation = words[0].upper() if words else "OTHER"
+    return operation if operation in OPERATIONS else "OTHER"
+
+
+def explain(conn: Any, statement: str, parameters: Any, executemany: bool) -> str | None:
+    """
+    SQLite 查询计划, 按语句缓存(计划只与语句有关)
+
+    使用同一连接的原始 DBAPI 游标执行, 处于同一事务中且不触发引擎事件; 失败时返回 None, 不影响原查询。
+    """
+    if conn.dialect.name != "sqlite" or statement_operation(statement) == "OTHER":
+        return None
+    plan = _plans.get(statement)
+    if plan is not None:
+        _plans.move_to_end(statement)
+        return plan
+
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        logger.debug(f"获取查询计划失败: {e}")
+        return None
+
+    # (id, parent, notused, detail), 按 parent 缩进还原树形结构
+    depths: dict[int, int] = {}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append(f"{'  ' * depths[node_id]}{detail}")
+    plan = "\n".join(lines)
+    _plans[statement] = plan
+    if len(_plans) > CACHE_SIZE:
+        _plans.popitem(last=False)
+    return plan
+
+
+def log_slow_query(
+    conn: Any, engine_name: str, statement: str, parameters: Any, executemany: bool,
+    elapsed: float, queries: RequestQueries | None,
+) -> None:
+    """记录慢查询: 耗时、所属路由、语句及查询计划, 不记录参数(可能包含口令哈希等敏感数据)"""
+    method, route = (queries.method, queries.route) if queries is not None else ("", "(非请求)")
+    if settings.METRICS_ENABLED:
+        DB_SLOW_QUERIES.labels(engine_name, method, route).inc()
+    message = f"慢查询: {elapsed * 1000:.1f}ms, 引擎 {engine_name}, 路由 {f'{method} {route}'.strip()}\n{statement[:STATEMENT_LOG_LENGTH]}"
+    plan = explain(conn, statement, parameters, executemany) if settings.QUERY_LOG_EXPLAIN else None
+    if plan:
+        message += f"\n查询计划:\n{plan}"
+    logger.warning(message)
+
+
+def instrument_queries(engine: Engine, name: str) -> None:
+    """通过引擎事件记录每条语句的耗时: 查询耗时指标、请求级统计及慢查询日志"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        if settings.METRICS_ENABLED:
+            DB_QUERY_DURATION.labels(name, statement_operation(statement)).observe(elapsed)
+        if not settings.QUERY_LOG_ENABLED:
+            return
+        queries = current_queries.get()
+        if queries is not None:
+            queries.add(statement, elapsed)
+        if elapsed >= settings.QUERY_LOG_SLOW_THRESHOLD:
+            log_slow_query(conn, name, statement, parameters, executemany, elapsed, queries)
+
+
+def finish_request(queries: RequestQueries) -> None:
+    """请求结束: 按路由记录查询次数与数据库耗时, 同一语句重复执行达到阈值时告警(每个路由与语句只告警一次)"""
+    if not queries.count:
+        return
+    route = f"{queries.method} {queries.route}"
+    if settings.METRICS_ENABLED:
+        HTTP_REQUEST_DB_QUERIES.labels(queries.method, queries.route).observe(queries.count)
+        HTTP_REQUEST_DB_DURATION.labels(queries.method, queries.route).observe(queries.duration)
+
+    for statement, count in queries.statements.items():
+        if count < settings.QUERY_LOG_REPEAT_THRESHOLD or (route, statement) in _warned:
+            continue
+        if len(_warned) >= CACHE_SIZE:
+            _warned.clear()
+        _warned.add((route, statement))
+        logger.warning(
+            f"疑似 N+1 查询: 路由 {route} 的一次请求中相同语句执行 {count} 次"
+            f"(共 {queries.count} 次查询, {queries.duration * 1000:.1f}ms)\n{statement[:STATEMENT_LOG_LENGTH]}"
+        )
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+
+from fastapi import HTTPException, Request, status
+
+from app.core.auth import read_session_token
+from app.core.cache import load_backend
+from app.core.config import RateLimitRule, settings
+from app.core.log import logger
+
+
+class RateLimitBackend(ABC):
+    """
+    限流后端接口: 按键维护令牌桶, 每次请求消耗一个令牌。
+    多进程部署时实现该接口接入共享存储(如 Redis 脚本原子地读取、补充并扣减令牌)即可在进程间共享额度。
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, rate: float, burst: int) -> tuple[bool, float, float]:
+        """
+        消耗一个令牌
+
+        Returns:
+            tuple[bool, float, float]: (是否放行, 剩余令牌数, 距下一个令牌可用的秒数)
+        """
+
+    @abstractmethod
+    async def refund(self, key: str, rate: float, burst: int) -> None:
+        """归还一个已消耗的令牌(同一请求的后续规则拒绝时, 撤销之前规则的消耗)"""
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    进程内限流后端, 单进程部署及测试使用(可传入假时钟)
+
+    桶按最近访问顺序保存, 每次请求从最久未访问的一端清理已回满的桶(与新建的桶等价),
+    并以 maxsize 为上限淘汰, 每次请求的开销为均摊常数时间, 内存不会无限增长。
+    """
+
+    def __init__(self, maxsize: int | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = settings.RATE_LIMIT_MAX_KEYS if maxsize is None else maxsize
+        self.clock = clock
+        # 键 -> (令牌数, 更新时间, 回满时间)
+        self.buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+
+    async def hit(self, key: str, rate: float, burst: int) -> tuple[bool, float, float]:
+        now = self.clock()
+        while self.buckets:
+            oldest = next(iter(self.buckets))
+            if self.buckets[oldest][2] > now:
+                break
+            del self.buckets[oldest]
+
+        bucket = self.buckets.pop(key, None)
+        tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+        if len(self.buckets) > self.maxsize:
+            self.buckets.popitem(last=False)
+        return allowed, tokens, 0 if allowed else (1 - tokens) / rate
+
+    async def refund(self, key: str, rate: float, burst: int) -> None:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return
+        tokens, updated, _ = bucket
+        tokens = min(burst, tokens + 1)
+        self.buckets[key] = (tokens, updated, updated + (burst - tokens) / rate)
+
+
+class RateLimiter:
+    """
+    按路由限流依赖: 以 "方法 路由模板" 查找 RATE_LIMITS 中的规则, 未配置的路由直接放行。
+    超出限制时返回 429, Retry-After 与 X-RateLimit-Reset 为距下一个令牌可用的秒数。
+    """
+
+    def __init__(self, backend: RateLimitBackend, rules: dict[str, list[RateLimitRule]], enabled: bool = True) -> None:
+        self.backend = backend
+        self.rules = rules
+        self.enabled = enabled
+        self.rejected = 0
+
+    async def __call__(self, request: Request) -> None:
+        if not self.enabled:
+            return
+        route = request.scope.get("route")
+        rules = self.rules.get(f"{request.method} {route.path}") if route is not None else None
+        if not rules:
+            return
+
+        # 已消耗令牌的规则: (键, 速率, 容量)
+        taken: list[tuple[str, float, int]] = []
+        for index, rule in enumerate(rules):
+            value = await self.key_value(request, rule)
+            key = f"{request.method} {route.path}#{index}:{rule.key}:{value}"
+            rate, burst = rule.limit / rule.period, rule.burst or rule.limit
+            allowed, remaining, retry_after = await self.backend.hit(key, rate, burst)
+            if allowed:
+                taken.append((key, rate, burst))
+            else:
+                # 被拒绝的请求不计入之前规则的额度(如按账号的规则拒绝时不消耗按 IP 的额度)
+                for args in taken:
+                    await self.backend.refund(*args)
+                self.rejected += 1
+                reset = math.ceil(retry_after)
+                logger.warning(f"请求限流: {request.method} {request.url.path}, {rule.key}={value}, {reset} 秒后重试")
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"请求过于频繁, 请 {reset} 秒后重试",
+                    headers={
+                        "Retry-After": str(reset),
+                        "X-RateLimit-Limit": str(burst),
+                        "X-RateLimit-Remaining": "0",
+                        "X-RateLimit-Reset": str(reset),
+                    },
+                )
+
+    @staticmethod
+    async def key_value(request: Request, rule: RateLimitRule) -> str:
+        client = request.client.host if request.client else "未知"
+        if rule.key == "username":
+            # 表单已由路由解析并缓存在请求对象上, 此处不会重复读取请求体
+            username = (await request.form()).get("username")
+            return str(username) if username else client
+        if rule.key == "user":
+            user_id = read_session_token(request.cookies.get(settings.SESSION_COOKIE_NAME))
+            return str(user_id) if user_id is not None else client
+        return client
+
+
+# 全局限流依赖
+rate_limiter = RateLimiter(
+    backend=load_backend(settings.RATE_LIMIT_BACKEND),
+    rules=settings.RATE_LIMITS,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
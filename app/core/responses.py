@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """由 pydantic-core 直接序列化为 UTF-8 字节, 不经过标准库 json"""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+from sqlalchemy import text
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.log import logger
+
+# FTS5 trigram 分词最少需要 3 个字符才能走索引
+FTS_MIN_LENGTH = 3
+
+# FTS 表是否存在, 首次查询时检测
+_fts_available: bool | None = None
+
+
+async def fts_available(db: Any) -> bool:
+    """检测 user_fts 虚拟表是否已由迁移创建"""
+    global _fts_available
+    if _fts_available is None:
+        result = await db.exec(
+            select(text("1")).select_from(text("sqlite_master")).where(text("type = 'table' AND name = 'user_fts'"))
+        )
+        _fts_available = result.first() is not None
+        if not _fts_available:
+            logger.warning("未检测到 user_fts 全文检索表, 名称搜索回退为 LIKE 查询, 请执行 upgrade 迁移")
+    return _fts_available
+
+
+async def name_filter(db: Any, column: Any, id_column: Any, name: str) -> Any:
+    """
+    构造名称搜索条件
+
+    - 以 * 结尾为前缀查询, 使用名称字段的 b-tree 索引做范围扫描
+    - 长度不少于 3 的子串查询, 使用 FTS5 trigram 索引
+    - 其余情况回退为 LIKE '%name%'
+    """
+    if name.endswith("*") and len(name) > 1:
+        prefix = name.rstrip("*")
+        return column.between(prefix, prefix + chr(0x10FFFF))
+
+    if settings.USER_SEARCH_FTS and len(name) >= FTS_MIN_LENGTH and await fts_available(db):
+        phrase = '"' + name.replace('"', '""') + '"'
+        return id_column.in_(
+            select(text("rowid")).select_from(text("user_fts")).where(text("user_fts MATCH :phrase").bindparams(phrase=phrase))
+        )
+
+    return column.contains(name)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import settings
+
+
+PREFIX = "$scrypt$"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # 预留两倍内存上限, 避免调大成本参数后超出 OpenSSL 默认的 32MB 限制
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * (n + p), dklen=32)
+
+
+def hash_password(password: str, n: int, r: int, p: int) -> str:
+    """
+    计算口令哈希
+
+    Returns:
+        str: $scrypt$n=16384,r=8,p=1$<盐>$<哈希>, 成本参数随哈希保存, 便于调整参数后识别旧哈希
+    """
+    salt = os.urandom(16)
+    return f"{PREFIX}n={n},r={r},p={p}${_b64encode(salt)}${_b64encode(_scrypt(password, salt, n, r, p))}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """按哈希中保存的参数重新计算并比较, 格式不合法时返回 False"""
+    try:
+        _, _, params, salt, digest = encoded.split("$")
+        cost = dict(item.split("=") for item in params.split(","))
+        expected = _scrypt(password, _b64decode(salt), int(cost["n"]), int(cost["r"]), int(cost["p"]))
+    except (ValueError, KeyError):
+        return False
+    return hmac.compare_digest(expected, _b64decode(digest))
+
+
+class PasswordHasher:
+    """
+    口令哈希服务
+
+    scrypt 计算需要数十毫秒, 统一提交到有界执行池, 不阻塞事件循环;
+    执行池在首次使用时创建, 避免在派生工作进程之前启动线程或子进程。
+    """
+
+    def __init__(self, n: int, r: int, p: int, executor: str = "thread", workers: int = 4) -> None:
+        self.n = n
+        self.r = r
+        self.p = p
+        self.executor_type = executor
+        self.workers = workers
+        self._executor: Executor | None = None
+        # 账号不存在时也执行一次校验, 使响应时间不暴露账号是否存在
+        self._dummy_hash: str | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.n, self.r, self.p)
+
+    async def verify(self, password: str, encoded: str | None) -> bool:
+        if encoded is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash(os.urandom(16).hex())
+            await self._run(verify_password, password, self._dummy_hash)
+            return False
+        return await self._run(verify_password, password, encoded)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """成本参数与当前配置不一致时需要重新哈希"""
+        return not encoded.startswith(f"{PREFIX}n={self.n},r={self.r},p={self.p}$")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局口令哈希实例
+password_hasher = PasswordHasher(
+    n=settings.PASSWORD_SCRYPT_N,
+    r=settings.PASSWORD_SCRYPT_R,
+    p=settings.PASSWORD_SCRYPT_P,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+)
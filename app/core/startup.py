@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import unicodedata
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """
+    启动耗时记录: 按阶段记录导入与初始化耗时
+
+    本模块只依赖标准库, 须在其他模块之前导入, 导入阶段的耗时才完整。
+    模块已被导入过时该阶段记录为 0, 因此阶段的先后顺序决定了耗时归属。
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self) -> str:
+        width = max((display_width(name) for name, _ in self.phases), default=0) + 4
+        lines = [f"启动耗时报告(进程 {os.getpid()}):"]
+        for name, elapsed in [*self.phases, ("合计", sum(elapsed for _, elapsed in self.phases))]:
+            lines.append(f"  {name}{' ' * (width - display_width(name))}{elapsed * 1000:>10.1f}ms")
+        lines[-1] += f"  (自开始计时 {(time.perf_counter() - self.started) * 1000:.1f}ms)"
+        return "\n".join(lines)
+
+
+def display_width(text: str) -> int:
+    """终端显示宽度, 中文等全角字符占两列"""
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+# 全局启动计时(每个进程一个)
+startup_timer = StartupTimer()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import time
+from collections import defaultdict
+from typing import Any
+
+import jinja2
+from fastapi import templating
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.templating import _TemplateResponse
+
+from app.core.assets import create_url_for
+from app.core.config import settings
+from app.core.log import logger
+from app.core.metrics import TEMPLATE_RENDER_DURATION
+
+
+class TimedJinja2Templates(templating.Jinja2Templates):
+    """
+    模板渲染器: 生产模式下关闭 auto_reload 并使用共享的文件字节码缓存,
+    同时统计每个模板的渲染耗时。
+    """
+
+    def __init__(self, env: jinja2.Environment) -> None:
+        super().__init__(env=env)
+        # 模板名称 -> [渲染次数, 总耗时(秒), 最大耗时(秒)]
+        self.stats: defaultdict[str, list] = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def TemplateResponse(
+        self,
+        request: Request,
+        name: str,
+        context: dict[str, Any] | None = None,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+    ) -> _TemplateResponse:
+        start_time = time.perf_counter()
+        response = super().TemplateResponse(
+            request=request,
+            name=name,
+            context=context or {},
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            background=background,
+        )
+        elapsed = time.perf_counter() - start_time
+        stat = self.stats[name]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] = max(stat[2], elapsed)
+        TEMPLATE_RENDER_DURATION.labels(name).observe(elapsed)
+        response.headers["X-Template-Time"] = str(round(elapsed, 5))
+        return response
+
+    def precompile(self) -> list[str]:
+        """预编译全部模板, 写入内存缓存和字节码缓存"""
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        return names
+
+    def render_stats(self) -> dict[str, dict[str, float]]:
+        """各模板渲染耗时统计(毫秒)"""
+        return {
+            name: {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 3),
+                "max_ms": round(max_time * 1000, 3),
+            }
+            for name, (count, total, max_time) in sorted(self.stats.items(), key=lambda item: -item[1][1])
+            if count
+        }
+
+    def log_stats(self) -> None:
+        for name, stat in self.render_stats().items():
+            logger.info(f"模板渲染统计: {name}, 次数: {stat['count']}, 平均: {stat['avg_ms']}ms, 最大: {stat['max_ms']}ms")
+
+
+def is_partial(request: Request) -> bool:
+    """请求是否只需要页面片段(由页面脚本通过 X-Partial 请求头发起)"""
+    return request.headers.get("X-Partial", "").lower() == "true"
+
+
+def is_production() -> bool:
+    """模板生产模式, 未配置时跟随 DEBUG"""
+    return settings.TEMPLATE_PRODUCTION if settings.TEMPLATE_PRODUCTION is not None else not settings.DEBUG
+
+
+def create_environment(production: bool | None = None) -> jinja2.Environment:
+    """创建模板环境, 生产模式下关闭自动重载并启用字节码缓存"""
+    if production is None:
+        production = is_production()
+    options: dict[str, Any] = {
+        "loader": jinja2.FileSystemLoader(settings.BASE_DIR.joinpath("templates")),
+        "autoescape": True,
+    }
+    if production:
+        cache_dir = settings.BASE_DIR.joinpath(settings.TEMPLATE_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        options["auto_reload"] = False
+        options["bytecode_cache"] = jinja2.FileSystemBytecodeCache(directory=str(cache_dir))
+    env = jinja2.Environment(**options)
+    # Jinja2Templates 仅在未定义时注入 url_for, 此处替换为按构建清单解析静态资源的版本
+    env.globals["url_for"] = create_url_for(production)
+    return env
+
+
+templates = TimedJinja2Templates(env=create_environment())
@@ -14,11 +14,14 @@ class Response(SQLModel, Generic[T]):
 # 分页模型
 class Page(SQLModel):
     items: list = Field(default=[], description="数据列表")
-    total: int = Field(default=0, description="总记录数")
-    page_no: int = Field(default=1, description="当前页码")
+    total: int | None = Field(default=0, description="总记录数, 未统计时为空")
+    page_no: int | None = Field(default=1, description="当前页码, 游标分页时为空")
     page_size: int = Field(default=10, description="每页数量")
-    total_pages: int = Field(default=0, description="总页数")
+    total_pages: int | None = Field(default=0, description="总页数, 未统计时为空")
     has_next: bool = Field(default=False, description="是否有下一页")
+    has_prev: bool = Field(default=False, description="是否有上一页")
+    next_cursor: str | None = Field(default=None, description="下一页游标")
+    prev_cursor: str | None = Field(default=None, description="上一页游标")
 
 
 # 创建模型
@@ -39,10 +42,64 @@ class UserUpdateSchema(SQLModel):
 
 # ORM 模型
 class User(SQLModel, table=True):
+    # AUTOINCREMENT: 不复用已删除用户的 ID, ETag 等由 ID 派生的标识不会指向新用户
+    __table_args__ = {"sqlite_autoincrement": True}
+
     id: int | None = Field(default=None, primary_key=True, description="用户ID")
     name: str = Field(index=True, nullable=False, description="用户名")
     username: str = Field(unique=True, description="账号")
     password: str = Field(description="密码")
     is_superuser: bool = Field(default=False, description="是否超级用户")
     description: str | None = Field(default=None, description="描述")
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"}, description="行版本号, 每次更新由触发器递增")
+
+
+# 表版本号, 由 user 表上的触发器在增删改时递增, 用于列表的条件请求
+class TableVersion(SQLModel, table=True):
+    __tablename__ = "table_version"
+
+    name: str = Field(primary_key=True, description="表名")
+    version: int = Field(default=0, description="版本号")
+
+
+# 对外输出模型(不含密码)
+class UserPublic(SQLModel):
+    id: int = Field(description="用户ID")
+    name: str = Field(description="用户名")
+    username: str = Field(description="账号")
+    is_superuser: bool = Field(default=False, description="是否超级用户")
+    description: str | None = Field(default=None, description="描述")
+    version: int = Field(default=1, description="行版本号, 更新时通过 If-Match 传回")
+
+
+# 当前登录用户身份(缓存于内存, 不含密码)
+class Identity(SQLModel):
+    id: int = Field(description="用户ID")
+    name: str = Field(description="用户名")
+    username: str = Field(description="账号")
+    is_superuser: bool = Field(default=False, description="是否超级用户")
+
+
+# 批量操作报告
+class BulkError(SQLModel):
+    line: int = Field(description="行号")
+    key: str | int | None = Field(default=None, description="账号或用户ID")
+    error: str = Field(description="错误信息")
+
+
+class BulkReport(SQLModel):
+    total: int = Field(default=0, description="处理行数")
+    succeeded: int = Field(default=0, description="成功行数")
+    failed: int = Field(default=0, description="失败行数")
+    errors: list[BulkError] = Field(default=[], description="错误明细, 超出上限的不再记录")
+    max_errors: int = Field(default=1000, exclude=True, description="错误明细上限")
+
+    def fail(self, line: int, key: str | int | None, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(BulkError(line=line, key=key, error=error))
+
 
+# 批量删除模型
+class UserBulkDeleteSchema(SQLModel):
+    ids: list[int] = Field(description="用户ID列表")
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import render_metrics
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", summary="Prometheus 指标", include_in_schema=False)
+def metrics() -> Response:
+    """多进程模式下需要读取共享文件, 定义为同步函数在线程池中执行"""
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
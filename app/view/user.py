@@ -1,18 +1,43 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
 import json
-from fastapi import HTTPException, Query, Request, APIRouter, Depends, status, Path, Form, templating
-from fastapi.responses import RedirectResponse, JSONResponse
-from sqlmodel import Session, desc, func, select, asc, and_, or_
+from fastapi import HTTPException, Query, Request, APIRouter, Depends, status, Path, Form
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.dialects.sqlite import insert as insert_stmt
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import desc, func, select, asc, and_, or_, update as update_stmt, delete as delete_stmt
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.model.user import User, UserCreateSchema, UserUpdateSchema, Page, Response
-from app.core.database import get_db
+from app.model.user import User, UserCreateSchema, UserUpdateSchema, UserBulkDeleteSchema, UserPublic, TableVersion, BulkReport, Page, Response
+from app.core.bulk import batched, detect_format, iter_records
+from app.core.auth import create_session_token, get_current_user
+from app.core.cache import identity_cache, user_list_cache
+from app.core.export import MEDIA_TYPES, gzip_stream, iter_csv, iter_jsonl
+from app.core.conditional import etag_matches, make_etag, not_modified
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.pagination import encode_cursor, keyset_paginate
+from app.core.ratelimit import rate_limiter
+from app.core.responses import FastJSONResponse
+from app.core.search import name_filter
+from app.core.security import password_hasher
 from app.core.log import logger
+from app.core.templates import is_partial, templates
 
-templates = templating.Jinja2Templates(directory="templates")
 
 
-router = APIRouter()
+# 限流规则按路由配置在 RATE_LIMITS 中, 未配置的路由直接放行
+router = APIRouter(dependencies=[Depends(rate_limiter)])
+
+# 对外输出字段(不含密码), 查询时只选取这些列
+PUBLIC_FIELDS = tuple(UserPublic.model_fields)
+PUBLIC_COLUMNS = [getattr(User, key) for key in PUBLIC_FIELDS]
+
+def to_public(user: User) -> dict:
+    """ORM 对象转为对外输出的字典"""
+    return {key: getattr(user, key) for key in PUBLIC_FIELDS}
 
 @router.get("/", summary="登陆页面")
 async def index(
@@ -20,7 +45,7 @@ async def index(
 ):
     return templates.TemplateResponse(request=request,name="login.html")
 
-@router.get("/home", summary="首页页面")
+@router.get("/home", summary="首页页面", dependencies=[Depends(get_current_user)])
 async def home(
     request: Request
 ):
@@ -31,10 +56,12 @@ async def login(
     request: Request,
     username: str = Form(..., description="账号"), 
     password: str = Form(..., description="密码"), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    existing_user = db.exec(select(User).where(User.username == username)).first()
-    if not existing_user or existing_user.password != password:
+    # 从只读连接池查询, 校验口令期间不占用唯一的写连接
+    existing_user = (await db.exec(select(User).where(User.username == username))).first()
+    await db.close()
+    if not await password_hasher.verify(password, existing_user.password if existing_user else None):
         logger.warning(f"用户名或密码错误")
         return templates.TemplateResponse(
             request=request,
@@ -45,28 +72,34 @@ async def login(
             ).model_dump(),
             status_code=status.HTTP_401_UNAUTHORIZED
         )
+    if password_hasher.needs_rehash(existing_user.password):
+        # 成本参数调整后, 借登录时拿到的明文口令按新参数重新哈希, 哈希完成后才获取写连接
+        password_hash = await password_hasher.hash(password)
+        async for write_db in get_db():
+            await write_db.exec(update_stmt(User).where(User.id == existing_user.id).values(password=password_hash))
+            await write_db.commit()
+        logger.info(f"用户 {username} 口令已重新哈希")
     logger.info(f"用户 {username} 登录成功")
-    return RedirectResponse(url="/home", status_code=status.HTTP_302_FOUND)
-
-@router.get("/users", summary="用户分页", response_model=Page)
-async def list(
-    request: Request,
-    offset: int = Query(default=0, description="偏移量"),
-    limit: int = Query(default=10, description="每页数量"),
-    order_by: str | None = Query(default=None, description="排序字段", example={"id": "asc"}),
-    name: str | None = Query(default=None, description="名称"),
-    db: Session = Depends(get_db)
-):
-    sql = select(User)
-    if name:
-        sql = sql.where(and_(User.name.contains(name)))
+    response = RedirectResponse(url="/home", status_code=status.HTTP_302_FOUND)
+    response.set_cookie(
+        key=settings.SESSION_COOKIE_NAME,
+        value=create_session_token(existing_user.id),
+        max_age=settings.SESSION_MAX_AGE,
+        httponly=True,
+        secure=settings.SESSION_COOKIE_SECURE,
+        samesite="lax",
+    )
+    return response
 
-    # 获取总数
-    total = db.exec(select(func.count()).select_from(sql)).first()
-    if total is None:
-        total = 0
+@router.get("/logout", summary="退出登录")
+async def logout():
+    response = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
+    response.delete_cookie(key=settings.SESSION_COOKIE_NAME, httponly=True, secure=settings.SESSION_COOKIE_SECURE, samesite="lax")
+    return response
 
-    # 处理排序
+def parse_order_by(order_by: str | None) -> list[tuple[str, bool]]:
+    """解析排序参数, 返回 (字段, 是否倒序) 列表"""
+    order_columns = []
     if order_by:
         try:
             order_by_dict = json.loads(order_by)
@@ -74,123 +107,298 @@ async def list(
                 if not hasattr(User, key):
                     logger.warning(f"无效的排序字段: {key}")
                     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"无效的排序字段: {key}")
-                order_func = desc if value.lower() == 'desc' else asc
-                sql = sql.order_by(order_func(getattr(User, key)))
+                order_columns.append((key, value.lower() == 'desc'))
         except json.JSONDecodeError:
             logger.warning("排序参数格式错误")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="排序参数格式错误")
+    return order_columns
+
+async def query_user_page(
+    db: AsyncSession,
+    offset: int,
+    limit: int,
+    order_by: str | None,
+    name: str | None,
+    cursor: str | None,
+    count: bool | None,
+) -> dict:
+    """查询用户分页数据, 只选取输出列并直接构造模板上下文, 不逐行做模型校验"""
+    sql = select(*PUBLIC_COLUMNS)
+    if name:
+        sql = sql.where(and_(await name_filter(db, User.name, User.id, name)))
+
+    # 获取总数
+    total: int | None = None
+    if count is None:
+        count = cursor is None
+    if count:
+        total = (await db.exec(select(func.count()).select_from(sql))).first() or 0
+
+    # 处理排序
+    order_columns = parse_order_by(order_by)
+
+    # 游标只支持单个非空排序字段(主键作为次序依据)
+    order_key, descending = order_columns[0] if order_columns else ("id", False)
+    keyset = len(order_columns) <= 1 and order_key in PUBLIC_FIELDS and not User.__table__.c[order_key].nullable
+    if cursor and not keyset:
+        logger.warning(f"游标分页不支持该排序: {order_by}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"游标分页不支持该排序: {order_by}")
+
+    # 分页, 多取一行用于判断是否有下一页
+    backward = False
+    if cursor:
+        try:
+            sql, backward = keyset_paginate(sql, getattr(User, order_key), User.id, descending, cursor, limit)
+        except ValueError as e:
+            logger.warning(str(e))
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    else:
+        for key, is_desc in order_columns:
+            sql = sql.order_by(desc(getattr(User, key)) if is_desc else asc(getattr(User, key)))
+        if keyset and (order_key != "id" or not order_columns):
+            # 与游标分页相同的次序(主键作为次序依据), 排序字段存在重复值时由此页生成的游标才能接续
+            sql = sql.order_by(desc(User.id) if descending else asc(User.id))
+        sql = sql.offset(offset).limit(limit + 1)
+    users = (await db.exec(sql)).all()
 
-    # 分页
-    users = db.exec(sql.offset(offset).limit(limit)).all()
+    more = len(users) > limit
+    users = users[:limit]
+    if backward:
+        users = users[::-1]
+    if cursor:
+        has_next, has_prev = (True, more) if backward else (more, True)
+    else:
+        has_next, has_prev = more, offset > 0
+
+    next_cursor = prev_cursor = None
+    if keyset and users:
+        if has_next:
+            next_cursor = encode_cursor(getattr(users[-1], order_key), users[-1].id, "next")
+        if has_prev:
+            prev_cursor = encode_cursor(getattr(users[0], order_key), users[0].id, "prev")
+
+    return {
+        "code": status.HTTP_200_OK,
+        "message": "获取列表成功",
+        "data": {
+            "items": [user._asdict() for user in users],
+            "total": total,
+            "page_no": None if cursor else (offset // limit + 1 if limit else 1),
+            "page_size": limit,
+            "total_pages": None if total is None else ((total + limit - 1) // limit if limit else 1),
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        },
+    }
+
+@router.get("/users", summary="用户分页", response_model=Page, dependencies=[Depends(get_current_user)])
+async def list(
+    request: Request,
+    offset: int = Query(default=0, description="偏移量"),
+    limit: int = Query(default=10, description="每页数量"),
+    order_by: str | None = Query(default=None, description="排序字段", example={"id": "asc"}),
+    name: str | None = Query(default=None, description="名称, 以 * 结尾时按前缀查询"),
+    cursor: str | None = Query(default=None, description="分页游标, 传入时使用键集分页并忽略偏移量"),
+    count: bool | None = Query(default=None, description="是否统计总数, 默认偏移分页统计, 游标分页不统计"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # 表版本号、当前用户和是否片段共同决定页面内容, 未变化时直接返回 304, 不查询也不渲染
+    partial = is_partial(request)
+    version = (await db.exec(select(TableVersion.version).where(TableVersion.name == "user"))).first() or 0
+    etag = make_etag(version, request.state.user.id, int(partial))
+    if response := not_modified(request, etag):
+        return response
+
+    async def query() -> dict:
+        return await query_user_page(db, offset, limit, order_by, name, cursor, count)
+
+    hit = False
+    if settings.USER_LIST_CACHE_ENABLED:
+        context, hit = await user_list_cache.get_or_set((offset, limit, order_by, name, cursor, count), query)
+    else:
+        context = await query()
 
     logger.info("查询用户成功")
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         request=request,
-        name="user.html",
-        context=Response(
-            code=status.HTTP_200_OK,
-            message="获取列表成功",
-            data=Page(
-                items=[User.model_validate(user).model_dump() for user in users],
-                total=total,
-                page_no=offset // limit + 1 if limit else 1,
-                page_size=limit,
-                total_pages=(total + limit - 1) // limit if limit else 1,
-                has_next=offset + limit < total
-            ).model_dump()
-        ).model_dump(),
+        name="user_table.html" if partial else "user.html",
+        # 复制一份, 模板响应会向上下文写入 request, 不能污染缓存
+        context=dict(context),
         status_code=status.HTTP_200_OK
     )
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.headers["Vary"] = "X-Partial"
+    return response
 
-@router.post("/user", summary="创建用户", response_model=Response[User])
+@router.get("/users/export", summary="导出用户", dependencies=[Depends(get_current_user)])
+async def export(
+    format: str = Query(default="csv", description="导出格式 csv 或 jsonl"),
+    order_by: str | None = Query(default=None, description="排序字段", example={"id": "asc"}),
+    name: str | None = Query(default=None, description="名称, 以 * 结尾时按前缀查询"),
+    gzip: bool = Query(default=False, description="是否以 gzip 压缩输出"),
+):
+    """
+    导出用户
+
+    通过服务端游标按 EXPORT_BATCH_SIZE 分批读取、边查边写, 内存占用与数据量无关;
+    流式响应发送时依赖项已经退出, 因此在生成器内自行打开只读会话。
+    """
+    if format not in MEDIA_TYPES:
+        logger.warning(f"不支持的导出格式: {format}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"不支持的导出格式: {format}")
+    order_columns = parse_order_by(order_by)
+
+    async def partitions():
+        async for db in get_read_db():
+            sql = select(*PUBLIC_COLUMNS)
+            if name:
+                sql = sql.where(and_(await name_filter(db, User.name, User.id, name)))
+            for key, is_desc in order_columns:
+                sql = sql.order_by(desc(getattr(User, key)) if is_desc else asc(getattr(User, key)))
+            result = await db.stream(sql.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield rows
+
+    body = (iter_csv if format == "csv" else iter_jsonl)(PUBLIC_FIELDS, partitions())
+    filename, media_type = f"users.{format}", MEDIA_TYPES[format]
+    if gzip:
+        body, filename, media_type = gzip_stream(body), f"{filename}.gz", "application/gzip"
+
+    logger.info(f"导出用户: {filename}")
+    return StreamingResponse(
+        content=body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/user", summary="创建用户", response_model=Response[UserPublic], dependencies=[Depends(get_current_user)])
 async def create(
+    request: Request,
     name: str = Form(..., description="用户名"),
     username: str = Form(...,  description="账号"),
     password: str = Form(..., description="密码"),
     description: str = Form(None, description="描述"), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """创建用户"""
-    existing_user = db.exec(select(User).where(User.username == username)).first()
-    if existing_user:
-        logger.warning(f"创建用户失败：账号 {username} 已存在")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"账号 {username} 已存在")
-    
     user_create_schema = UserCreateSchema(
         name=name, 
         username=username, 
         password=password, 
         description=description
     )
-    user = User.model_validate(user_create_schema)
+    # 会话在首次查询时才获取连接, 先哈希口令, 避免哈希期间占用唯一的写连接
+    password_hash = await password_hasher.hash(password)
+
+    existing_user = (await db.exec(select(User).where(User.username == username))).first()
+    if existing_user:
+        logger.warning(f"创建用户失败：账号 {username} 已存在")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"账号 {username} 已存在")
+
+    user = User.model_validate(user_create_schema, update={"password": password_hash})
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await user_list_cache.invalidate()
     
     logger.info(f"用户 {name}({username}) 创建成功")
-    return JSONResponse(
+    if is_partial(request):
+        return templates.TemplateResponse(request=request, name="user_row.html", context={"user": to_public(user)})
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=Response(
-            message="创建用户成功",
-            data=user.model_dump()
-        ).model_dump()
+        content={"code": status.HTTP_200_OK, "message": "创建用户成功", "data": to_public(user)}
     )
 
-@router.get("/user/{id}", summary="用户详情", response_model=User)
+@router.get("/user/{id}", summary="用户详情", response_model=Response[UserPublic], dependencies=[Depends(get_current_user)])
 async def detail(
+    request: Request,
     id: int = Path(..., description="用户ID"), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取用户详情"""
-    existing_user = db.get(User, id)
+    """获取用户详情, ETag 由用户ID与行版本号生成(ID 不复用, 已删除用户的 ETag 不会与新用户匹配)"""
+    existing_user = (await db.exec(select(*PUBLIC_COLUMNS).where(User.id == id))).first()
     if not existing_user:
         logger.warning(f"用户{id}不存在")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
+    etag = make_etag(existing_user.id, existing_user.version)
+    if response := not_modified(request, etag):
+        return response
     
     logger.info(f"获取用户{id}详情成功")
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK, 
-        content=Response(code=status.HTTP_200_OK, message=f"获取用户{id}详情成功", data=existing_user.model_dump()).model_dump()
+        content={"code": status.HTTP_200_OK, "message": f"获取用户{id}详情成功", "data": existing_user._asdict()},
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
     )
 
-@router.put("/user/{id}", summary="更新用户", response_model=User)
+@router.put("/user/{id}", summary="更新用户", response_model=Response[UserPublic], dependencies=[Depends(get_current_user)])
 async def update(
+    request: Request,
     id: int = Path(..., description="用户ID"), 
     name: str | None = Form(None, description="用户名"),
     username: str | None = Form(None, description="用户名"),
     password: str | None = Form(None, description="密码"),
     description: str | None = Form(None, description="描述"), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """更新用户"""
-    existing_user = db.get(User, id)
+    """
+    更新用户
+
+    携带 If-Match 时按乐观锁更新: 版本号不匹配, 或读取之后被他人修改, 均返回 412
+    """
+    existing_user = await db.get(User, id)
     if not existing_user:
         logger.warning(f"用户{id}不存在")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"用户{id}不存在")
     if existing_user.is_superuser:
         logger.warning("超级管理员不允许修改")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="超级管理员不允许修改")
+    if_match = request.headers.get("if-match")
+    if if_match and not etag_matches(if_match, make_etag(existing_user.id, existing_user.version)):
+        logger.warning(f"用户{id}已被修改, 版本号不匹配")
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=f"用户{id}已被修改, 请刷新后重试")
 
-    user_update_schema = UserUpdateSchema(name=name, username=username, password=password, description=description)
-    update_data_dict = user_update_schema.model_dump(exclude_unset=True)
-    
-    existing_user.sqlmodel_update(update_data_dict)
-    db.add(existing_user)
-    db.commit()
-    db.refresh(existing_user)
+    # 未提交或留空的字段不更新
+    user_update_schema = UserUpdateSchema(name=name, username=username, password=password or None, description=description)
+    update_data_dict = user_update_schema.model_dump(exclude_none=True)
+    if update_data_dict.get("password"):
+        update_data_dict["password"] = await password_hasher.hash(update_data_dict["password"])
+
+    if update_data_dict:
+        sql = update_stmt(User).where(User.id == id).values(**update_data_dict)
+        if if_match:
+            # 以读取到的版本号作为更新条件, 读取之后被他人修改则不更新
+            sql = sql.where(User.version == existing_user.version)
+        if (await db.exec(sql)).rowcount == 0:
+            await db.rollback()
+            logger.warning(f"用户{id}已被修改, 更新冲突")
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=f"用户{id}已被修改, 请刷新后重试")
+        await db.commit()
+        await db.refresh(existing_user)
+        await user_list_cache.invalidate()
+        await identity_cache.delete(id)
     logger.info(f"更新用户{id}成功")
-    return JSONResponse(
+    headers = {"ETag": make_etag(existing_user.id, existing_user.version)}
+    if is_partial(request):
+        return templates.TemplateResponse(request=request, name="user_row.html", context={"user": to_public(existing_user)}, headers=headers)
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK, 
-        content=Response(code=status.HTTP_200_OK, message=f"更新用户{id}成功", data=existing_user.model_dump()).model_dump()
+        content={"code": status.HTTP_200_OK, "message": f"更新用户{id}成功", "data": to_public(existing_user)},
+        headers=headers
     )
 
-@router.delete("/user/{id}", summary="删除用户", response_model=User)
+@router.delete("/user/{id}", summary="删除用户", response_model=Response[UserPublic], dependencies=[Depends(get_current_user)])
 async def delete(
+    request: Request,
     id: int = Path(..., description="用户ID"), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """删除用户"""
-    existing_user = db.get(User, id)
+    existing_user = await db.get(User, id)
     if not existing_user:
         logger.warning(f"用户{id}不存在")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"用户{id}不存在")
@@ -198,12 +406,228 @@ async def delete(
         logger.warning("超级管理员不允许删除")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="超级管理员不允许删除")
     
-    db.delete(existing_user)
-    db.commit()
+    await db.delete(existing_user)
+    await db.commit()
+    await user_list_cache.invalidate()
+    await identity_cache.delete(id)
     logger.info(f"删除用户{id}成功")
-    return JSONResponse(
+    if is_partial(request):
+        # 页面脚本直接移除该行, 无需返回内容
+        return HTMLResponse(content="")
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK, 
-        content=Response(code=status.HTTP_200_OK, message=f"删除用户{id}成功", data=existing_user.model_dump()).model_dump()
+        content={"code": status.HTTP_200_OK, "message": f"删除用户{id}成功", "data": to_public(existing_user)}
     )
 
 
+def validation_message(e: ValidationError) -> str:
+    """将校验错误压缩为一行, 用于批量操作报告"""
+    return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+
+@router.post("/users/bulk", summary="批量导入用户", response_model=Response[BulkReport], dependencies=[Depends(get_current_user)])
+async def bulk_create(
+    request: Request,
+    format: str | None = Query(default=None, description="数据格式 jsonl 或 csv, 默认按 Content-Type 判断"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    批量导入用户
+
+    请求体为 JSON Lines 或带表头(name,username,password,description)的 CSV, 边接收边解析;
+    每批先按账号集合查询一次排除已存在账号, 在执行池中并发计算口令哈希,
+    再以一条 INSERT ... ON CONFLICT DO NOTHING RETURNING 的 executemany 写入并提交,
+    并发导入时由账号唯一索引兜底, 未返回的账号即为已存在。
+    """
+    data_format = detect_format(request.headers.get("content-type"), format)
+    if data_format not in ("jsonl", "csv"):
+        logger.warning(f"不支持的数据格式: {data_format}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"不支持的数据格式: {data_format}")
+
+    report = BulkReport(max_errors=settings.BULK_MAX_ERRORS)
+    seen: set[str] = set()
+    sql = insert_stmt(User.__table__).on_conflict_do_nothing(index_elements=["username"]).returning(User.__table__.c.username)
+    async for batch in batched(iter_records(request.stream(), data_format, settings.BULK_MAX_LINE_LENGTH), settings.BULK_BATCH_SIZE):
+        rows: dict[str, tuple[int, dict]] = {}
+        for line, record in batch:
+            report.total += 1
+            if isinstance(record, str):
+                report.fail(line, None, record)
+                continue
+            try:
+                user = UserCreateSchema.model_validate(record)
+            except ValidationError as e:
+                report.fail(line, record.get("username"), validation_message(e))
+                continue
+            if user.username in seen:
+                report.fail(line, user.username, f"账号 {user.username} 重复")
+                continue
+            seen.add(user.username)
+            rows[user.username] = (line, {**user.model_dump(), "is_superuser": False})
+        if not rows:
+            continue
+
+        # 先排除已存在的账号, 避免为其计算口令哈希
+        for username in (await db.exec(select(User.username).where(User.username.in_(tuple(rows))))).all():
+            line, _ = rows.pop(username)
+            report.fail(line, username, f"账号 {username} 已存在")
+        if not rows:
+            continue
+        hashes = await asyncio.gather(*(password_hasher.hash(row["password"]) for _, row in rows.values()))
+        for (_, row), hashed in zip(rows.values(), hashes):
+            row["password"] = hashed
+
+        try:
+            created = set((await db.exec(sql, params=[row for _, row in rows.values()])).scalars().all())
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            logger.warning(f"批量导入失败: {e.orig}")
+            for username, (line, _) in rows.items():
+                report.fail(line, username, f"写入失败: {e.orig}")
+            continue
+        report.succeeded += len(created)
+        for username, (line, _) in rows.items():
+            if username not in created:
+                report.fail(line, username, f"账号 {username} 已存在")
+
+    if report.succeeded:
+        await user_list_cache.invalidate()
+    logger.info(f"批量导入用户: 共 {report.total} 行, 成功 {report.succeeded} 行, 失败 {report.failed} 行")
+    return FastJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=Response(code=status.HTTP_200_OK, message="批量导入用户完成", data=report.model_dump()).model_dump()
+    )
+
+@router.put("/users/bulk", summary="批量更新用户", response_model=Response[BulkReport], dependencies=[Depends(get_current_user)])
+async def bulk_update(
+    request: Request,
+    format: str | None = Query(default=None, description="数据格式 jsonl 或 csv, 默认按 Content-Type 判断"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    批量更新用户
+
+    每行包含 id 及需要更新的字段, 每批先按 ID 和账号集合各查询一次校验存在性、超级管理员与账号唯一,
+    再以按主键的 executemany UPDATE 写入并提交。
+    """
+    data_format = detect_format(request.headers.get("content-type"), format)
+    if data_format not in ("jsonl", "csv"):
+        logger.warning(f"不支持的数据格式: {data_format}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"不支持的数据格式: {data_format}")
+
+    report = BulkReport(max_errors=settings.BULK_MAX_ERRORS)
+    seen_ids: set[int] = set()
+    seen_usernames: set[str] = set()
+    changed_ids: list[int] = []
+    async for batch in batched(iter_records(request.stream(), data_format, settings.BULK_MAX_LINE_LENGTH), settings.BULK_BATCH_SIZE):
+        rows: dict[int, tuple[int, dict]] = {}
+        for line, record in batch:
+            report.total += 1
+            if isinstance(record, str):
+                report.fail(line, None, record)
+                continue
+            record = dict(record)
+            try:
+                id = int(record.pop("id"))
+            except (KeyError, TypeError, ValueError):
+                report.fail(line, None, "缺少有效的用户ID")
+                continue
+            try:
+                update_data = UserUpdateSchema.model_validate(record).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                report.fail(line, id, validation_message(e))
+                continue
+            empty = [key for key, value in update_data.items() if value is None and not User.__table__.c[key].nullable]
+            if empty or not update_data:
+                report.fail(line, id, f"字段不能为空: {', '.join(empty)}" if empty else "没有需要更新的字段")
+                continue
+            if id in seen_ids:
+                report.fail(line, id, f"用户{id}重复")
+                continue
+            seen_ids.add(id)
+            rows[id] = (line, {"id": id, **update_data})
+        if not rows:
+            continue
+
+        # 存在性与超级管理员校验
+        existing = {user_id: is_superuser for user_id, is_superuser in (await db.exec(select(User.id, User.is_superuser).where(User.id.in_(tuple(rows))))).all()}
+        for id in [id for id in rows if id not in existing or existing[id]]:
+            line, _ = rows.pop(id)
+            report.fail(line, id, f"用户{id}不存在" if id not in existing else "超级管理员不允许修改")
+
+        # 账号唯一校验: 文件内去重, 再与库中其他用户的账号比对
+        usernames = {row["username"]: id for id, (_, row) in rows.items() if row.get("username")}
+        owners = dict((await db.exec(select(User.username, User.id).where(User.username.in_(tuple(usernames))))).all()) if usernames else {}
+        for username, id in usernames.items():
+            if username in seen_usernames or owners.get(username, id) != id:
+                line, _ = rows.pop(id)
+                report.fail(line, id, f"账号 {username} 已存在")
+            else:
+                seen_usernames.add(username)
+        if not rows:
+            continue
+        hashing = [row for _, row in rows.values() if row.get("password")]
+        hashes = await asyncio.gather(*(password_hasher.hash(row["password"]) for row in hashing))
+        for row, hashed in zip(hashing, hashes):
+            row["password"] = hashed
+
+        try:
+            await db.exec(update_stmt(User), params=[row for _, row in rows.values()])
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            logger.warning(f"批量更新失败: {e.orig}")
+            for id, (line, _) in rows.items():
+                report.fail(line, id, f"写入失败: {e.orig}")
+            continue
+        report.succeeded += len(rows)
+        changed_ids.extend(rows)
+
+    if report.succeeded:
+        await user_list_cache.invalidate()
+        await identity_cache.delete(*changed_ids)
+    logger.info(f"批量更新用户: 共 {report.total} 行, 成功 {report.succeeded} 行, 失败 {report.failed} 行")
+    return FastJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=Response(code=status.HTTP_200_OK, message="批量更新用户完成", data=report.model_dump()).model_dump()
+    )
+
+@router.delete("/users/bulk", summary="批量删除用户", response_model=Response[BulkReport], dependencies=[Depends(get_current_user)])
+async def bulk_delete(
+    user_bulk_delete_schema: UserBulkDeleteSchema,
+    db: AsyncSession = Depends(get_db)
+):
+    """批量删除用户, 每批一条 DELETE ... WHERE id IN (...) 并提交, 报告中的行号为 ID 在列表中的序号"""
+    report = BulkReport(max_errors=settings.BULK_MAX_ERRORS)
+    ids = user_bulk_delete_schema.ids
+    seen: set[int] = set()
+    changed_ids: list[int] = []
+    for start in range(0, len(ids), settings.BULK_BATCH_SIZE):
+        rows: dict[int, int] = {}
+        for line, id in enumerate(ids[start:start + settings.BULK_BATCH_SIZE], start=start + 1):
+            report.total += 1
+            if id in seen:
+                report.fail(line, id, f"用户{id}重复")
+                continue
+            seen.add(id)
+            rows[id] = line
+
+        existing = {user_id: is_superuser for user_id, is_superuser in (await db.exec(select(User.id, User.is_superuser).where(User.id.in_(tuple(rows))))).all()}
+        for id in [id for id in rows if id not in existing or existing[id]]:
+            report.fail(rows.pop(id), id, f"用户{id}不存在" if id not in existing else "超级管理员不允许删除")
+        if not rows:
+            continue
+
+        await db.exec(delete_stmt(User).where(User.id.in_(tuple(rows))))
+        await db.commit()
+        report.succeeded += len(rows)
+        changed_ids.extend(rows)
+
+    if report.succeeded:
+        await user_list_cache.invalidate()
+        await identity_cache.delete(*changed_ids)
+    logger.info(f"批量删除用户: 共 {report.total} 个, 成功 {report.succeeded} 个, 失败 {report.failed} 个")
+    return FastJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=Response(code=status.HTTP_200_OK, message="批量删除用户完成", data=report.model_dump()).model_dump()
+    )
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+登录校验开销压测: 会话签名校验 + 身份缓存命中, 与每次查询数据库对比
+
+    python -m benchmarks.bench_auth --requests 20000
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+
+# 应用在导入时读取配置, 必须先指向临时数据库
+DB_DIR = Path(tempfile.mkdtemp())
+os.environ["SQLITE_DB_NAME"] = str(DB_DIR.joinpath("bench_auth.db"))
+
+from alembic import command  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.core import auth  # noqa: E402
+from app.core.cache import identity_cache  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import create_db_and_tables  # noqa: E402
+
+
+def build_request(token: str) -> Request:
+    cookie = f"{settings.SESSION_COOKIE_NAME}={token}".encode()
+    return Request({"type": "http", "method": "GET", "path": "/users", "headers": [(b"cookie", cookie)], "state": {}})
+
+
+async def measure(requests: int, token: str) -> float:
+    """返回每次校验的平均耗时(微秒)"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        await auth.get_current_user(build_request(token))
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def run(requests: int) -> None:
+    await create_db_and_tables()
+    token = auth.create_session_token(1)
+
+    # 构造请求对象本身的开销, 从结果中扣除
+    start = time.perf_counter()
+    for _ in range(requests):
+        build_request(token)
+    baseline = (time.perf_counter() - start) / requests * 1_000_000
+
+    cached = await measure(requests, token) - baseline
+    identity_cache.ttl = 0
+    identity_cache.entries.clear()
+    uncached = await measure(max(requests // 20, 1), token) - baseline
+    typer.echo(f"身份缓存命中: {cached:.1f}µs/次 (命中 {identity_cache.hits})")
+    typer.echo(f"每次查询数据库: {uncached:.1f}µs/次")
+
+
+def main(requests: int = typer.Option(20000, help="校验次数")) -> None:
+    command.upgrade(app_main.alembic_config(), "head")
+    asyncio.run(run(requests))
+
+    for file in DB_DIR.iterdir():
+        file.unlink()
+    DB_DIR.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+批量导入与逐条创建对比压测(走完整接口与迁移后的表结构, 含账号唯一索引和全文检索触发器)
+
+    python -m benchmarks.bench_bulk --rows 100000 --sample 1000
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+
+# 应用在导入时读取配置, 必须先指向临时数据库
+DB_DIR = Path(tempfile.mkdtemp())
+os.environ["SQLITE_DB_NAME"] = str(DB_DIR.joinpath("bench_bulk.db"))
+# 压测会反复登录和写入, 关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+os.environ["USER_LIST_CACHE_ENABLED"] = "False"
+# 口令哈希开销由 bench_login 单独衡量, 这里降低成本参数以观察导入链路本身
+os.environ.setdefault("PASSWORD_SCRYPT_N", "16")
+
+from alembic import command  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.core.log import logger  # noqa: E402
+
+
+def jsonl_body(prefix: str, rows: int, chunk: int = 1000):
+    """分块生成 JSON Lines 请求体, 以流式上传"""
+    for start in range(0, rows, chunk):
+        yield "".join(
+            json.dumps({"name": f"导入用户{i}", "username": f"{prefix}{i:07d}", "password": "123456"}) + "\n"
+            for i in range(start, min(start + chunk, rows))
+        ).encode()
+
+
+def csv_body(prefix: str, rows: int, chunk: int = 1000):
+    yield b"name,username,password,description\n"
+    for start in range(0, rows, chunk):
+        yield "".join(
+            f"导入用户{i},{prefix}{i:07d},123456,\n" for i in range(start, min(start + chunk, rows))
+        ).encode()
+
+
+def main(
+    rows: int = typer.Option(100000, help="批量导入行数"),
+    sample: int = typer.Option(1000, help="逐条创建的采样行数, 按比例折算到 rows"),
+) -> None:
+    command.upgrade(app_main.alembic_config(), "head")
+    logger.setLevel("WARNING")
+
+    with TestClient(app_main.create_app()) as client:
+        client.post("/login", data={"username": "admin", "password": "123456"}, follow_redirects=False)
+        start = time.perf_counter()
+        for i in range(sample):
+            response = client.post("/user", data={"name": f"逐条用户{i}", "username": f"s{i:07d}", "password": "123456"})
+            response.raise_for_status()
+        elapsed = (time.perf_counter() - start) / sample * rows
+        typer.echo(f"逐条创建: {rows / elapsed:.0f} 行/s, 折算 {rows} 行约 {elapsed:.1f}s")
+
+        for name, prefix, body, content_type in (
+            ("批量导入 JSON Lines", "j", jsonl_body, "application/x-ndjson"),
+            ("批量导入 CSV", "c", csv_body, "text/csv"),
+        ):
+            start = time.perf_counter()
+            response = client.post("/users/bulk", content=body(prefix, rows), headers={"content-type": content_type})
+            response.raise_for_status()
+            elapsed = time.perf_counter() - start
+            report = response.json()["data"]
+            typer.echo(
+                f"{name}: {report['succeeded'] / elapsed:.0f} 行/s, {rows} 行耗时 {elapsed:.1f}s, "
+                f"成功 {report['succeeded']} 失败 {report['failed']}"
+            )
+
+    for file in DB_DIR.iterdir():
+        file.unlink()
+    DB_DIR.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+登录吞吐压测: 逐级提高并发, 报告登录 p99 不超过目标时的最大吞吐,
+同时并发请求用户详情, 观察口令哈希对其他请求延迟的影响。
+对比在事件循环内直接计算哈希(改造前)与提交到执行池两种方式。
+
+    python -m benchmarks.bench_login --p99 250 --seconds 5
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+
+# 应用在导入时读取配置, 必须先指向临时数据库
+DB_DIR = Path(tempfile.mkdtemp())
+os.environ["SQLITE_DB_NAME"] = str(DB_DIR.joinpath("bench_login.db"))
+# 压测会反复登录和写入, 关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+
+import httpx  # noqa: E402
+from alembic import command  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.database import create_db_and_tables  # noqa: E402
+from app.core.log import logger  # noqa: E402
+from app.view import user as user_view  # noqa: E402
+
+
+class InlineHasher(security.PasswordHasher):
+    """改造前的做法: 在事件循环内同步计算"""
+
+    async def hash(self, password: str) -> str:
+        return security.hash_password(password, self.n, self.r, self.p)
+
+    async def verify(self, password: str, encoded: str | None) -> bool:
+        return encoded is not None and security.verify_password(password, encoded)
+
+
+def p99(latencies: list[float]) -> float:
+    return statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, seconds: float) -> tuple[float, float, float]:
+    """以固定并发持续登录, 返回 (登录吞吐, 登录 p99 毫秒, 详情 p99 毫秒)"""
+    logins: list[float] = []
+    details: list[float] = []
+    deadline = time.perf_counter() + seconds
+
+    async def login() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post("/login", data={"username": "admin", "password": "123456"})
+            assert response.status_code == 302, response.status_code
+            logins.append((time.perf_counter() - start) * 1000)
+
+    async def detail() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            (await client.get("/user/1")).raise_for_status()
+            details.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(detail(), *(login() for _ in range(concurrency)))
+    return len(logins) / seconds, p99(logins), p99(details)
+
+
+async def sweep(name: str, hasher: security.PasswordHasher, target: float, seconds: float, max_concurrency: int) -> None:
+    user_view.password_hasher = hasher
+    transport = httpx.ASGITransport(app=app_main.create_app())
+    best = None
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 详情接口需要登录
+        await client.post("/login", data={"username": "admin", "password": "123456"})
+        concurrency = 1
+        while concurrency <= max_concurrency:
+            rps, login_p99, detail_p99 = await run_level(client, concurrency, seconds)
+            typer.echo(f"  {name} 并发 {concurrency}: 登录 {rps:.0f}/s, 登录 p99 {login_p99:.0f}ms, 详情 p99 {detail_p99:.0f}ms")
+            if login_p99 > target:
+                break
+            best = (concurrency, rps)
+            concurrency *= 2
+    hasher.shutdown()
+    if best:
+        typer.echo(f"{name}: p99 <= {target:.0f}ms 时最大吞吐 {best[1]:.0f}/s (并发 {best[0]})")
+    else:
+        typer.echo(f"{name}: 并发 1 时 p99 已超过 {target:.0f}ms")
+
+
+async def run(target: float, seconds: float, max_concurrency: int, workers: int, executor: str) -> None:
+    await create_db_and_tables()
+    cost = {"n": security.password_hasher.n, "r": security.password_hasher.r, "p": security.password_hasher.p}
+    await sweep("事件循环内计算", InlineHasher(**cost), target, seconds, max_concurrency)
+    await sweep(f"{executor} 执行池", security.PasswordHasher(**cost, executor=executor, workers=workers), target, seconds, max_concurrency)
+
+
+def main(
+    p99_target: float = typer.Option(250, "--p99", help="登录 p99 目标(毫秒)"),
+    seconds: float = typer.Option(5, help="每级并发持续时间(秒)"),
+    max_concurrency: int = typer.Option(64, help="最大并发"),
+    workers: int = typer.Option(4, help="执行池大小"),
+    executor: str = typer.Option("thread", help="执行池类型 thread 或 process"),
+) -> None:
+    command.upgrade(app_main.alembic_config(), "head")
+    logger.setLevel("WARNING")
+    asyncio.run(run(p99_target, seconds, max_concurrency, workers, executor))
+
+    for file in DB_DIR.iterdir():
+        file.unlink()
+    DB_DIR.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+请求日志中间件吞吐对比: 旧版 BaseHTTPMiddleware 实现与纯 ASGI 实现
+
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+from fastapi import FastAPI, status
+from fastapi.responses import PlainTextResponse
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.log import logger
+from app.core.middlewares import RequestLogMiddleware
+
+
+class LegacyRequestLogMiddleware(BaseHTTPMiddleware):
+    """改造前的请求日志中间件, 仅用于对比"""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        start_time: float = time.time()
+        logger.info(
+            f"请求来源: {request.client.host if request.client else '未知'}, "
+            f"请求方法: {request.method}, "
+            f"请求路径: {request.url.path}, "
+        )
+        response: Response = await call_next(request)
+        process_time: float = round(time.time() - start_time, 5)
+        response.headers["X-Process-Time"] = str(process_time)
+        if response.status_code == status.HTTP_200_OK:
+            logger.info(
+                f"请求成功: {response.status_code},"
+                f"响应内容长度: {response.headers.get('content-length', '0')}, "
+                f"处理时间: {process_time}s"
+            )
+        else:
+            logger.error(f"请求失败: {response.status_code}, 处理时间: {process_time}s")
+        return response
+
+
+def build_app(middleware: type, **options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> PlainTextResponse:
+        return PlainTextResponse("pong")
+
+    app.add_middleware(middleware, **options)
+    return app
+
+
+async def drive(app: FastAPI, requests: int, concurrency: int) -> float:
+    """不经过网络直接调用 ASGI 应用, 返回每秒请求数"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+def main(
+    requests: int = typer.Option(20000, help="请求总数"),
+    concurrency: int = typer.Option(50, help="并发数"),
+) -> None:
+    # 日志统一写入临时文件, 保留同步写文件的开销但不污染控制台
+    log_file = Path(tempfile.mkdtemp()).joinpath("bench.log")
+    handlers = logger.handlers[:]
+    logger.handlers = [logging.FileHandler(log_file, encoding="utf-8")]
+    try:
+        cases = [
+            ("BaseHTTPMiddleware(旧版)", build_app(LegacyRequestLogMiddleware)),
+            ("纯 ASGI, 全量日志", build_app(RequestLogMiddleware, sample_rate=1.0)),
+            ("纯 ASGI, 采样 1%", build_app(RequestLogMiddleware, sample_rate=0.01)),
+        ]
+        for name, app in cases:
+            asyncio.run(drive(app, requests // 10, concurrency))
+            rps = asyncio.run(drive(app, requests, concurrency))
+            typer.echo(f"{name:<28} {rps:>10.0f} req/s")
+    finally:
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = handlers
+        log_file.unlink(missing_ok=True)
+        log_file.parent.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+偏移分页与键集分页对比压测
+
+    python -m benchmarks.bench_pagination --rows 1000000 --page 1000
+"""
+
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+from sqlmodel import SQLModel, Session, asc, create_engine, desc, func, insert, select
+
+from app.core.pagination import encode_cursor, keyset_paginate
+from app.model.user import User
+
+
+def seed(engine, rows: int, batch: int = 50000) -> None:
+    """批量写入测试数据"""
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            conn.execute(insert(User), [
+                {"name": f"用户{i % 9973:04d}", "username": f"user{i:07d}", "password": "123456", "is_superuser": False}
+                for i in range(start, min(start + batch, rows))
+            ])
+
+
+def timed(func_, repeat: int) -> tuple[float, float]:
+    """返回 (中位数, 最大值) 毫秒"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func_()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main(
+    rows: int = typer.Option(1_000_000, help="测试数据行数"),
+    page: int = typer.Option(1000, help="测试页码"),
+    limit: int = typer.Option(10, help="每页数量"),
+    repeat: int = typer.Option(20, help="重复次数"),
+) -> None:
+    db_path = Path(tempfile.mkdtemp()).joinpath("bench_pagination.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    start = time.perf_counter()
+    seed(engine, rows)
+    typer.echo(f"写入 {rows} 行用时 {time.perf_counter() - start:.1f}s")
+
+    offset = (page - 1) * limit
+    with Session(engine) as session:
+        for key, descending in (("id", False), ("name", True)):
+            column = getattr(User, key)
+            order_func = desc if descending else asc
+            ordered = select(User).order_by(order_func(column), order_func(User.id))
+
+            # 键集分页的游标来自上一页最后一行
+            last = session.exec(ordered.offset(offset - 1).limit(1)).one()
+            cursor = encode_cursor(getattr(last, key), last.id)
+            keyset_sql, _ = keyset_paginate(select(User), column, User.id, descending, cursor, limit)
+            keyset_rows = session.exec(keyset_sql).all()[:limit]
+            offset_rows = session.exec(ordered.offset(offset).limit(limit)).all()
+            assert [u.id for u in keyset_rows] == [u.id for u in offset_rows]
+
+            count_ms = timed(lambda: session.exec(select(func.count()).select_from(User)).one(), repeat)
+            offset_ms = timed(lambda: session.exec(ordered.offset(offset).limit(limit + 1)).all(), repeat)
+            keyset_ms = timed(lambda: session.exec(keyset_sql).all(), repeat)
+            typer.echo(f"排序 {key} {'desc' if descending else 'asc'} 第 {page} 页 (中位数/最大值 ms):")
+            typer.echo(f"  偏移分页 + 统计总数: {offset_ms[0] + count_ms[0]:.3f} / {offset_ms[1] + count_ms[1]:.3f}")
+            typer.echo(f"  偏移分页:            {offset_ms[0]:.3f} / {offset_ms[1]:.3f}")
+            typer.echo(f"  键集分页:            {keyset_ms[0]:.3f} / {keyset_ms[1]:.3f}")
+
+    engine.dispose()
+    db_path.unlink(missing_ok=True)
+    db_path.parent.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
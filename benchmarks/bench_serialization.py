@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+列表/详情序列化对比压测: 逐行模型校验 + 多层 model_dump + 标准库 json(改造前)
+与只选取输出列 + 一次构造 + pydantic-core 序列化
+
+    python -m benchmarks.bench_serialization --sizes 10,100,1000
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+from sqlmodel import SQLModel, Session, create_engine, insert, select
+
+from app.core.responses import FastJSONResponse
+from app.model.user import Page, Response, User, UserPublic
+
+
+PUBLIC_COLUMNS = [getattr(User, key) for key in UserPublic.model_fields]
+
+
+def legacy_page(session: Session, limit: int) -> bytes:
+    """改造前: 查询整行, 每行校验并导出, 再逐层包装导出"""
+    users = session.exec(select(User).offset(0).limit(limit + 1)).all()
+    content = Response(
+        code=200,
+        message="获取列表成功",
+        data=Page(
+            items=[User.model_validate(user).model_dump() for user in users[:limit]],
+            total=len(users),
+            page_no=1,
+            page_size=limit,
+            total_pages=1,
+            has_next=len(users) > limit,
+        ).model_dump()
+    ).model_dump()
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_page(session: Session, limit: int) -> bytes:
+    """改造后: 只选取输出列, 行元组直接构造字典, 一次序列化"""
+    users = session.exec(select(*PUBLIC_COLUMNS).offset(0).limit(limit + 1)).all()
+    content = {
+        "code": 200,
+        "message": "获取列表成功",
+        "data": {
+            "items": [user._asdict() for user in users[:limit]],
+            "total": len(users),
+            "page_no": 1,
+            "page_size": limit,
+            "total_pages": 1,
+            "has_next": len(users) > limit,
+        },
+    }
+    return FastJSONResponse(content=content).body
+
+
+def measure(func, session: Session, limit: int, seconds: float) -> float:
+    """返回平均耗时(毫秒)"""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        func(session, limit)
+        count += 1
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main(
+    sizes: str = typer.Option("10,100,1000", help="每页数量, 逗号分隔"),
+    seconds: float = typer.Option(2, help="每组持续时间(秒)"),
+) -> None:
+    db_path = Path(tempfile.mkdtemp()).joinpath("bench_serialization.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"name": f"用户{i:05d}", "username": f"user{i:05d}", "password": "$scrypt$" + "x" * 80,
+             "is_superuser": False, "description": f"描述{i}"}
+            for i in range(10000)
+        ])
+
+    with Session(engine) as session:
+        for limit in [int(size) for size in sizes.split(",")]:
+            legacy = measure(legacy_page, session, limit, seconds)
+            fast = measure(fast_page, session, limit, seconds)
+            typer.echo(f"每页 {limit}: 改造前 {legacy:.3f}ms, 改造后 {fast:.3f}ms, 提升 {legacy / fast:.1f} 倍")
+
+    engine.dispose()
+    for file in db_path.parent.iterdir():
+        file.unlink()
+    db_path.parent.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
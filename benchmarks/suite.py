@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+应用整体压测: 在临时数据库中写入 N 个用户, 分别在进程内(ASGI 直连)和本地 uvicorn 上
+以给定并发持续请求登录、列表、详情、创建、更新、删除接口, 报告吞吐与 p50/p95/p99,
+结果保存为 JSON, 可与之前的结果对比。
+
+    python main.py bench --users 10000 --concurrency 1,16 --seconds 5
+    python main.py bench --modes inprocess --compare .cache/bench/bench-20250101-120000.json
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import typer
+
+# 应用在导入时读取配置, 必须先指向临时数据库
+DB_DIR = Path(tempfile.mkdtemp())
+os.environ["SQLITE_DB_NAME"] = str(DB_DIR.joinpath("bench_suite.db"))
+# 压测会反复登录和写入, 关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+
+import httpx  # noqa: E402
+from alembic import command  # noqa: E402
+from sqlmodel import insert  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import create_db_and_tables, engine  # noqa: E402
+from app.core.log import logger  # noqa: E402
+from app.core.security import hash_password  # noqa: E402
+from app.model.user import User  # noqa: E402
+
+
+PASSWORD = "123456"
+SCENARIOS = ("login", "list", "list_filtered", "detail", "create", "update", "delete")
+
+
+class Workload:
+    """
+    各场景的单次请求, 返回是否成功, 返回 None 表示没有可用数据(停止该并发协程)
+
+    种子用户前一半供详情、更新随机读取, 后一半与压测中新建的用户供删除, 互不影响。
+    """
+
+    def __init__(self, users: int) -> None:
+        self.sequence = itertools.count()
+        self.readable = range(2, users // 2 + 2)
+        self.deletable = list(range(users // 2 + 2, users + 2))
+
+    async def login(self, client: httpx.AsyncClient) -> bool:
+        response = await client.post("/login", data={"username": "admin", "password": PASSWORD})
+        return response.status_code == 302
+
+    async def list(self, client: httpx.AsyncClient) -> bool:
+        response = await client.get("/users", params={"offset": random.randrange(100) * 10, "limit": 10})
+        return response.status_code == 200
+
+    async def list_filtered(self, client: httpx.AsyncClient) -> bool:
+        response = await client.get("/users", params={
+            "name": f"用户{random.randrange(100):02d}",
+            "order_by": json.dumps({"id": "desc"}),
+            "limit": 10,
+        })
+        return response.status_code == 200
+
+    async def detail(self, client: httpx.AsyncClient) -> bool:
+        response = await client.get(f"/user/{random.choice(self.readable)}")
+        return response.status_code == 200
+
+    async def create(self, client: httpx.AsyncClient) -> bool:
+        seq = next(self.sequence)
+        response = await client.post("/user", data={"name": f"压测{seq}", "username": f"bench{seq:010d}", "password": PASSWORD})
+        if response.status_code != 200:
+            return False
+        self.deletable.append(response.json()["data"]["id"])
+        return True
+
+    async def update(self, client: httpx.AsyncClient) -> bool:
+        seq = next(self.sequence)
+        response = await client.put(f"/user/{random.choice(self.readable)}", data={"name": f"更新{seq}", "description": f"压测更新{seq}"})
+        return response.status_code == 200
+
+    async def delete(self, client: httpx.AsyncClient) -> bool | None:
+        if not self.deletable:
+            return None
+        response = await client.delete(f"/user/{self.deletable.pop()}")
+        return response.status_code == 200
+
+
+def seed(users: int) -> None:
+    """迁移并写入测试用户, 所有用户共用一个口令哈希, 避免逐个计算"""
+    command.upgrade(app_main.alembic_config(), "head")
+    asyncio.run(create_db_and_tables())
+    password = hash_password(PASSWORD, settings.PASSWORD_SCRYPT_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P)
+    with engine.begin() as conn:
+        for start in range(0, users, 1000):
+            conn.execute(insert(User), [
+                {"name": f"用户{i:05d}", "username": f"user{i:07d}", "password": password,
+                 "is_superuser": False, "description": f"描述{i}"}
+                for i in range(start, min(start + 1000, users))
+            ])
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, float]:
+    """汇总单个场景的吞吐与延迟(毫秒)"""
+    if not latencies:
+        return {"requests": 0, "errors": errors, "rps": 0, "mean_ms": 0, "p50_ms": 0, "p95_ms": 0, "p99_ms": 0}
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "p99_ms": round(quantiles[98], 3),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, workload: Workload, scenario: str, concurrency: int, seconds: float) -> dict[str, float]:
+    """以固定并发持续请求一个场景"""
+    request = getattr(workload, scenario)
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = await request(client)
+            except httpx.HTTPError:
+                ok = False
+            if ok is None:
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_mode(
+    mode: str,
+    client: httpx.AsyncClient,
+    workload: Workload,
+    scenarios: list[str],
+    levels: list[int],
+    seconds: float,
+) -> list[dict]:
+    results = []
+    # 除登录场景外都需要登录态
+    response = await client.post("/login", data={"username": "admin", "password": PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f"登录失败, 状态码 {response.status_code}")
+    for concurrency in levels:
+        for scenario in scenarios:
+            result = {"mode": mode, "scenario": scenario, "concurrency": concurrency}
+            result.update(await run_scenario(client, workload, scenario, concurrency, seconds))
+            results.append(result)
+            typer.echo(
+                f"{mode:<10} {scenario:<14} 并发 {concurrency:<4} {result['rps']:>9.1f}/s  "
+                f"p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+                f"请求 {result['requests']}  失败 {result['errors']}"
+            )
+    return results
+
+
+async def run_inprocess(workload: Workload, scenarios: list[str], levels: list[int], seconds: float) -> list[dict]:
+    """进程内直接调用 ASGI 应用, 不经过网络和 HTTP 解析"""
+    transport = httpx.ASGITransport(app=app_main.create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run_mode("inprocess", client, workload, scenarios, levels, seconds)
+
+
+async def run_uvicorn(workload: Workload, scenarios: list[str], levels: list[int], seconds: float, workers: int, port: int) -> list[dict]:
+    """以 serve 命令启动本地 uvicorn(生产配置), 通过 TCP 请求"""
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError(f"uvicorn 启动失败, 退出码 {server.returncode}")
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn 启动超时")
+            return await run_mode(f"uvicorn-{workers}", client, workload, scenarios, levels, seconds)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_file: Path) -> None:
+    """按 (模式, 场景, 并发) 对比吞吐与 p99"""
+    baseline = {(item["mode"], item["scenario"], item["concurrency"]): item for item in json.loads(baseline_file.read_text(encoding="utf-8"))["results"]}
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+    typer.echo(f"\n与 {baseline_file} 对比:")
+    for result in results:
+        old = baseline.get((result["mode"], result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        typer.echo(
+            f"{result['mode']:<10} {result['scenario']:<14} 并发 {result['concurrency']:<4} "
+            f"吞吐 {old['rps']:.1f} -> {result['rps']:.1f} ({change(result['rps'], old['rps'])})  "
+            f"p99 {old['p99_ms']:.2f} -> {result['p99_ms']:.2f}ms ({change(result['p99_ms'], old['p99_ms'])})"
+        )
+
+
+def main(
+    users: int = typer.Option(10000, help="种子用户数"),
+    concurrency: str = typer.Option("1,16", help="并发数, 逗号分隔"),
+    seconds: float = typer.Option(5, help="每个场景持续时间(秒)"),
+    modes: str = typer.Option("inprocess,uvicorn", help="压测方式: inprocess 进程内, uvicorn 本地服务"),
+    scenarios: str = typer.Option(",".join(SCENARIOS), help="场景, 逗号分隔"),
+    workers: int = typer.Option(1, help="uvicorn 工作进程数"),
+    port: int = typer.Option(8765, help="uvicorn 监听端口"),
+    output: Path | None = typer.Option(None, help="结果文件, 默认 .cache/bench/bench-<时间>.json"),
+    baseline: Path | None = typer.Option(None, "--compare", help="对比的历史结果文件"),
+) -> None:
+    selected = [scenario.strip() for scenario in scenarios.split(",")]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        raise typer.BadParameter(f"未知场景: {', '.join(sorted(unknown))}", param_hint="--scenarios")
+    levels = [int(level) for level in concurrency.split(",")]
+
+    started = datetime.now()
+    seed(users)
+    logger.setLevel("WARNING")
+    workload = Workload(users)
+    results: list[dict] = []
+    for mode in [mode.strip() for mode in modes.split(",")]:
+        if mode == "inprocess":
+            results += asyncio.run(run_inprocess(workload, selected, levels, seconds))
+        elif mode == "uvicorn":
+            results += asyncio.run(run_uvicorn(workload, selected, levels, seconds, workers, port))
+        else:
+            raise typer.BadParameter(f"未知压测方式: {mode}", param_hint="--modes")
+
+    output = output or settings.BASE_DIR.joinpath(".cache", "bench", f"bench-{started:%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "users": users,
+            "seconds": seconds,
+            "workers": workers,
+            "database_async": settings.DATABASE_ASYNC,
+            "password_scrypt_n": settings.PASSWORD_SCRYPT_N,
+        },
+        "results": results,
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+    typer.echo(f"\n结果已保存: {output}")
+    if baseline:
+        compare(results, baseline)
+
+    for file in DB_DIR.iterdir():
+        file.unlink()
+    DB_DIR.rmdir()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,92 +1,31 @@
 # -*- coding: utf-8 -*-
+"""
+命令行入口, 命令定义在 app/cli.py 中, 只在作为脚本执行时导入。
 
-import typer
-import uvicorn
-from typer.main import Typer
-from alembic import command
-from alembic.config import Config
-from collections.abc import AsyncGenerator
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.concurrency import asynccontextmanager
+serve 多进程时 uvicorn 以 spawn 方式启动工作进程, 子进程会以 __mp_main__ 重新执行本模块,
+因此顶层不导入 typer 等命令行依赖; 工作进程直接从 app.application 加载应用。
+"""
 
-from app.core.log import logger, uvicorn_logger
-from app.core.database import create_db_and_tables
-from app.core.exceptions import register_exception_handler
-from app.core.middlewares import register_middleware_handler
 
-app: Typer = typer.Typer()
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+def alembic_config():
     """
-    自定义生命周期
+    Alembic 配置, 供压测等脚本在进程内执行迁移
     """
-    logger.info(f"服务启动...{app.title}")
-    await create_db_and_tables()
-    yield
-    logger.info(f"服务关闭...{app.title}")
-
-
-# 初始化 Alembic 配置
-alembic_cfg: Config = Config(file_="alembic.ini")
-
+    from app.cli import alembic_config
 
-@app.command()
-def revision(message: str = "生成新的 Alembic 迁移脚本") -> None:
-    """
-    生成新的 Alembic 迁移脚本。
-    """
-    command.revision(config=alembic_cfg, message=message, autogenerate=True)
-    typer.echo(message=f"迁移脚本已生成: {message}")
+    return alembic_config()
 
 
-@app.command()
-def upgrade() -> None:
+def create_app():
     """
-    应用最新的 Alembic 迁移。
+    应用工厂, 供压测等脚本在进程内创建应用
     """
-    command.upgrade(config=alembic_cfg, revision="head")
-    typer.echo(message="所有迁移已应用。")
-
-
-def create_app() -> FastAPI:
-
-    # 创建FastAPI应用
-    app: FastAPI = FastAPI(lifespan=lifespan, debug=True)
+    from app.application import create_app
 
-    # 挂载静态文件
-    app.mount(path="/static", app=StaticFiles(directory="static"), name="static")
-
-    # # 注册中间件
-    register_middleware_handler(app)
-
-    # # 注册异常
-    register_exception_handler(app)
-
-    # 注册路由
-    from app.view.user import router as user_router
-
-    app.include_router(router=user_router, tags=["用户模块"])
-
-    return app
-
-
-@app.command()
-def run() -> None:
-    """
-    启动应用。
-    """
-    uvicorn.run(
-        app="main:create_app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        factory=True,
-        log_config=uvicorn_logger(),
-    )
+    return create_app()
 
 
 if __name__ == "__main__":
+    from app.cli import app
+
     app()